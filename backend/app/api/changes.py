@@ -1,7 +1,12 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal, get_db
 from app.core.rbac import Role, require_role
 from app.core.security import get_current_user
 from app.graph.neo4j_client import neo4j_client
@@ -294,6 +299,74 @@ async def get_change_impact(
     return {"change_id": change_id, "impact": impact}
 
 
+def _sse(payload: dict, event: str | None = None) -> str:
+    data = json.dumps(jsonable_encoder(payload))
+    return f"event: {event}\ndata: {data}\n\n" if event else f"data: {data}\n\n"
+
+
+@router.get("/impact/stream")
+async def stream_change_impacts(
+    ids: list[str] = Query(...),
+    refresh: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    _=Depends(get_current_user),
+):
+    """Push the impact of several changes as Server-Sent Events.
+
+    Cached impacts are sent first; the rest are analysed concurrently and
+    each is sent, and cached, as soon as its analysis finishes. Every event
+    carries the same ``{"change_id", "impact"}`` body as ``GET /{id}/impact``;
+    a failed analysis is reported as an ``error`` event instead.
+    """
+    cached: list[tuple[str, dict]] = []
+    pending: list[tuple[str, dict]] = []
+    for change_id in ids:
+        change = await change_service.get_change(db, change_id)
+        if change is None:
+            raise HTTPException(status_code=404, detail=f"Change {change_id} not found")
+        if change.impact_cache and not refresh:
+            cached.append((change_id, change.impact_cache))
+            continue
+        pending.append((change_id, {
+            "target_node_ids": [ic.graph_node_id for ic in change.impacted_components if ic.impact_level == "direct"],
+            "action": change.action,
+            "change_type": change.change_type,
+            "environment": change.environment,
+            "title": change.title,
+        }))
+    # The stream outlives this request's session, so it caches results
+    # through sessions of its own; end this one's transaction first.
+    await db.commit()
+
+    async def _analyze(change_id: str, kwargs: dict):
+        try:
+            return change_id, await impact_service.analyze_impact(**kwargs), None
+        except Exception as exc:
+            logger.exception("[IMPACT-API] Streamed analysis failed for %s", change_id)
+            return change_id, None, exc
+
+    async def _events():
+        for change_id, impact in cached:
+            yield _sse({"change_id": change_id, "impact": impact})
+        for next_done in asyncio.as_completed([_analyze(cid, kwargs) for cid, kwargs in pending]):
+            change_id, impact, exc = await next_done
+            if exc is not None:
+                yield _sse({"change_id": change_id, "detail": str(exc)}, event="error")
+                continue
+            async with AsyncSessionLocal() as session:
+                change = await change_service.get_change(session, change_id)
+                if change is not None:
+                    change.impact_cache = impact
+                    await session.commit()
+            yield _sse({"change_id": change_id, "impact": impact})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/{change_id}/approve", response_model=ChangeRead)
 async def approve_change(
     change_id: str,
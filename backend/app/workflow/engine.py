@@ -6,6 +6,7 @@ Routing logic:
   - High risk (71+):     CAB required → route to ALL lead roles
 """
 
+from collections import Counter
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
@@ -22,6 +23,19 @@ from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Shared immutable role sets — returned as-is so routing never rebuilds them.
+_HIGH_RISK_ROLES: tuple[str, ...] = ("Network", "Security", "DC Manager")
+_DEFAULT_ROLES: tuple[str, ...] = ("Network",)
+_ROLES_BY_CHANGE_TYPE: dict[str, tuple[str, ...]] = {
+    "firewall": ("Security",),
+    "switch": ("Network",),
+    "vlan": ("Network",),
+    "port": ("Network",),
+    "rack": ("DC Manager",),
+    "cloudsg": ("Security", "Network"),
+}
+
+
 class WorkflowEngine:
     async def route_change(
         self,
@@ -82,45 +96,37 @@ class WorkflowEngine:
         next_step = "cab-required" if risk_level == "high" else "targeted-approval"
         return {"next_step": next_step, "approvals_created": approvals_created, "required_roles": required_roles}
 
-    def _determine_required_roles(self, change: Change, risk_level: str) -> list[str]:
+    def _determine_required_roles(self, change: Change, risk_level: str) -> tuple[str, ...]:
         """Based on change type and risk level, decide who needs to approve."""
 
         if risk_level == "high":
             # CAB: everyone
-            return ["Network", "Security", "DC Manager"]
+            return _HIGH_RISK_ROLES
 
         # Medium: targeted
-        roles: list[str] = []
         change_type = change.change_type.lower() if change.change_type else ""
-
-        if change_type in ("firewall",):
-            roles.append("Security")
-        if change_type in ("switch", "vlan", "port"):
-            roles.append("Network")
-        if change_type in ("rack",):
-            roles.append("DC Manager")
-        if change_type in ("cloudsg",):
-            roles.append("Security")
-            roles.append("Network")
-
-        if not roles:
-            roles.append("Network")
-
-        return roles
+        return _ROLES_BY_CHANGE_TYPE.get(change_type, _DEFAULT_ROLES)
 
     async def check_approvals(self, db: AsyncSession, change_id: str) -> dict[str, Any]:
         """Check if all required approvals for a change have been granted."""
-        result = await db.execute(
-            select(Approval).where(Approval.change_id == change_id)
+        # Stream only the status column so large CAB changes never materialize
+        # a full list of Approval ORM instances just to count them.
+        result = await db.stream(
+            select(Approval.status)
+            .where(Approval.change_id == change_id)
+            .execution_options(yield_per=200)
         )
-        approvals = list(result.scalars().all())
+        counts: Counter[str] = Counter()
+        async for status in result.scalars():
+            counts[status] += 1
 
-        if not approvals:
+        total = sum(counts.values())
+        if not total:
             return {"all_approved": True, "pending": 0, "approved": 0, "rejected": 0}
 
-        pending = sum(1 for a in approvals if a.status == "Pending")
-        approved = sum(1 for a in approvals if a.status == "Approved")
-        rejected = sum(1 for a in approvals if a.status == "Rejected")
+        pending = counts["Pending"]
+        approved = counts["Approved"]
+        rejected = counts["Rejected"]
 
         all_approved = pending == 0 and rejected == 0 and approved > 0
         any_rejected = rejected > 0
@@ -131,7 +137,7 @@ class WorkflowEngine:
             "pending": pending,
             "approved": approved,
             "rejected": rejected,
-            "total": len(approvals),
+            "total": total,
         }
 
     async def handle_timeout(self, db: AsyncSession, change_id: str) -> int:
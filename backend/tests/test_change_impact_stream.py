@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from app.api import changes as changes_api
+from app.services import change_service, impact_service
+from tests.conftest import TestSession
+from tests.test_changes import _register_admin
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+async def _create_change(client, headers, title: str, target: str) -> str:
+    created = await client.post(
+        "/api/v1/changes",
+        json={
+            "title": title,
+            "change_type": "Firewall",
+            "environment": "Prod",
+            "description": "desc",
+            "execution_plan": "exec",
+            "rollback_plan": "rollback",
+            "maintenance_window_start": "2030-01-01T00:00:00Z",
+            "maintenance_window_end": "2030-01-01T01:00:00Z",
+            "target_components": [target],
+            "action": "add_rule",
+        },
+        headers=headers,
+    )
+    return created.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_stream_change_impacts(client, monkeypatch: pytest.MonkeyPatch):
+    async def _fake_impacted_components(target_components, depth=2, action=None):
+        return [
+            {
+                "graph_node_id": target_components[0],
+                "component_type": "Device",
+                "impact_level": "direct",
+            }
+        ]
+
+    analyzed: list[list[str]] = []
+
+    async def _fake_analyze_impact(target_node_ids, **kwargs):
+        analyzed.append(target_node_ids)
+        if target_node_ids == ["SW-BROKEN"]:
+            raise RuntimeError("graph unavailable")
+        return {"llm_powered": False, "total_dependency_count": len(target_node_ids), "targets": target_node_ids}
+
+    monkeypatch.setattr(change_service, "_build_impacted_components", _fake_impacted_components)
+    monkeypatch.setattr(impact_service, "analyze_impact", _fake_analyze_impact)
+    monkeypatch.setattr(changes_api, "AsyncSessionLocal", TestSession)
+
+    headers = await _register_admin(client)
+    ok_id = await _create_change(client, headers, "Stream ok", "FW-DC1-01")
+    broken_id = await _create_change(client, headers, "Stream broken", "SW-BROKEN")
+
+    res = await client.get(
+        "/api/v1/changes/impact/stream", params=[("ids", ok_id), ("ids", broken_id)], headers=headers
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = {data["change_id"]: (kind, data) for kind, data in _events(res.text)}
+    assert events[ok_id] == ("message", {"change_id": ok_id, "impact": {"llm_powered": False, "total_dependency_count": 1, "targets": ["FW-DC1-01"]}})
+    assert events[broken_id][0] == "error"
+    assert "graph unavailable" in events[broken_id][1]["detail"]
+
+    # The streamed result was cached: a second stream and the single-change
+    # endpoint serve it without another analysis.
+    analyzed.clear()
+    res = await client.get("/api/v1/changes/impact/stream", params={"ids": ok_id}, headers=headers)
+    assert _events(res.text) == [("message", {"change_id": ok_id, "impact": {"llm_powered": False, "total_dependency_count": 1, "targets": ["FW-DC1-01"]}})]
+    res = await client.get(f"/api/v1/changes/{ok_id}/impact", headers=headers)
+    assert res.json()["impact"]["targets"] == ["FW-DC1-01"]
+    assert analyzed == []
+
+
+@pytest.mark.asyncio
+async def test_stream_change_impacts_unknown_change(client):
+    headers = await _register_admin(client)
+    res = await client.get("/api/v1/changes/impact/stream", params={"ids": "missing"}, headers=headers)
+    assert res.status_code == 404
@@ -9,32 +9,46 @@ Usage (from the repo root):
     cd /path/to/deplyx
     # 1. Make sure the main deplyx stack is up:
     docker compose up -d
-    # 2. Run this script:
+    # 2. Run this script (add --rebuild to force an image rebuild):
     python lab/build-topology.py
 
 What it does:
     1. Starts the 5 mock network containers (fw-dc1-01, pa-dc1-01,
        cp-mgmt-01, sw-dc1-core, sw-dc2-core) using docker compose.
-    2. Waits until each container's service port is reachable.
+    2. Waits for the containers' healthchecks (``docker compose up --wait``;
+       one that stays red only warns), then probes each device's service
+       port from the host.
     3. Registers / updates each device as a connector via the deplyx REST API.
     4. Triggers an initial sync on each connector.
 
 Environment overrides (optional):
-    DEPLYX_API     base URL of the deplyx API   (default: http://localhost:8000)
-    DEPLYX_EMAIL   admin email                  (default: admin@deplyx.io)
-    DEPLYX_PASS    admin password               (default: Admin123!)
-    LAB_DIR        path to this lab/ directory  (default: auto-detected)
+    DEPLYX_API       base URL of the deplyx API   (default: http://localhost:8000)
+    DEPLYX_EMAIL     admin email                  (default: admin@deplyx.io)
+    DEPLYX_PASS      admin password               (default: Admin123!)
+    LAB_DIR          path to this lab/ directory  (default: auto-detected)
+    LAB_DEVICE_WAIT  seconds to wait for devices  (default: 60)
+
+The access token is cached in ``LAB_DIR/.deplyx-token`` so reruns skip the
+login round-trip while the token is still valid.
 """
 
 from __future__ import annotations
 
+import argparse
+import asyncio
+import base64
+import errno
+import functools
 import json
 import os
+import random
+import select
+import selectors
 import socket
-import subprocess
 import sys
+import threading
 import time
-import urllib.error
+import urllib.parse
 from pathlib import Path
 from typing import Any
 
@@ -48,6 +62,29 @@ ADMIN_PASS   = os.getenv("DEPLYX_PASS",  "Admin123!")
 LAB_DIR      = Path(os.getenv("LAB_DIR", Path(__file__).parent))
 HTTP_TIMEOUT = int(os.getenv("DEPLYX_HTTP_TIMEOUT", "30"))
 HTTP_RETRIES = int(os.getenv("DEPLYX_HTTP_RETRIES", "3"))
+DEVICE_WAIT  = int(os.getenv("LAB_DEVICE_WAIT", "60"))
+TOKEN_CACHE  = LAB_DIR / ".deplyx-token"
+
+# Device credentials, read once rather than on every discovered container
+FORTINET_API_TOKEN = os.getenv("FORTINET_API_TOKEN", "fg-lab-token-001")
+PALOALTO_API_KEY   = os.getenv("PALOALTO_API_KEY", "pa-lab-apikey-001")
+CHECKPOINT_USER    = os.getenv("CHECKPOINT_USER", "admin")
+CHECKPOINT_PASS    = os.getenv("CHECKPOINT_PASS", "Cp@ssw0rd!")
+CISCO_DRIVER_TYPE  = os.getenv("CISCO_DRIVER_TYPE", os.getenv("CISCO_DRIVER", "ios"))
+CISCO_USER         = os.getenv("CISCO_USER", "admin")
+CISCO_PASS         = os.getenv("CISCO_PASS", "Cisco123!")
+JUNIPER_USER       = os.getenv("JUNIPER_USER", "admin")
+JUNIPER_PASS       = os.getenv("JUNIPER_PASS", "Juniper123!")
+
+PROBE_MIN_DELAY = 0.2
+PROBE_MAX_DELAY = 3.0
+
+RETRYABLE_HTTP_CODES = {429, 502, 503, 504}
+# Methods that are safe to replay after a timeout or 5xx; anything else
+# (login, connector creation, sync triggers) is only retried on 429.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS"})
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 5.0
 
 SUPPORTED_TYPE_IDS = {"fortinet", "paloalto", "checkpoint", "cisco-ios", "cisco-nxos", "juniper"}
 
@@ -55,34 +92,116 @@ SUPPORTED_TYPE_IDS = {"fortinet", "paloalto", "checkpoint", "cisco-ios", "cisco-
 # Helpers
 # ---------------------------------------------------------------------------
 
+# orjson (optional) serialises straight to bytes and parses bytes without an
+# intermediate str; the stdlib is used when it is not installed.
 try:
-    import urllib.request
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
+try:
+    import http.client
+
+    _API_URL = urllib.parse.urlsplit(DEPLYX_API)
+    _API_PREFIX = f"{_API_URL.path.rstrip('/')}/api/v1"
+    _API_CONN_CLS = http.client.HTTPSConnection if _API_URL.scheme == "https" else http.client.HTTPConnection
+
+    # One kept-alive connection per worker thread (http.client is not
+    # thread-safe), so repeated calls reuse the same TCP socket.
+    _conn_local = threading.local()
+
+    def _connection() -> http.client.HTTPConnection:
+        conn = getattr(_conn_local, "conn", None)
+        if conn is None:
+            conn = _API_CONN_CLS(_API_URL.hostname, _API_URL.port, timeout=HTTP_TIMEOUT)
+            _conn_local.conn = conn
+        return conn
+
+    def _drop_connection() -> None:
+        conn = getattr(_conn_local, "conn", None)
+        if conn is not None:
+            conn.close()
+            _conn_local.conn = None
+
+    def _send(method: str, path: str, body: bytes | None, headers: dict[str, str]) -> tuple[http.client.HTTPResponse, bytes]:
+        conn = _connection()
+        reused = conn.sock is not None
+        if reused and method not in IDEMPOTENT_METHODS and select.select([conn.sock], [], [], 0)[0]:
+            # An idle keep-alive socket only turns readable once the server
+            # has closed it; open a fresh one before sending a request that
+            # must not be replayed.
+            _drop_connection()
+            conn = _connection()
+            reused = False
+        sent = False
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            sent = True
+            resp = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            _drop_connection()
+            # The server closed the idle keep-alive socket — reopen once.
+            # A non-idempotent request is only replayed if it never left the
+            # stale socket; once sent, the server may already have acted on it.
+            if method not in IDEMPOTENT_METHODS and (sent or not reused):
+                raise
+            conn = _connection()
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+        return resp, resp.read()
 
     def _http(method: str, path: str, data: dict | None = None, token: str | None = None) -> tuple[int, dict]:
-        url = f"{DEPLYX_API}/api/v1{path}"
-        body = json.dumps(data).encode() if data else None
-        req = urllib.request.Request(url, data=body, method=method)
-        req.add_header("Content-Type", "application/json")
+        body = _dumps(data) if data else None
+        headers = {"Content-Type": "application/json"}
         if token:
-            req.add_header("Authorization", f"Bearer {token}")
-        for attempt in range(1, max(1, HTTP_RETRIES) + 1):
+            headers["Authorization"] = f"Bearer {token}"
+        idempotent = method in IDEMPOTENT_METHODS
+        attempts = max(1, HTTP_RETRIES)
+        delay = 0.0
+        for attempt in range(1, attempts + 1):
+            retry_after: float | None = None
             try:
-                with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as resp:
-                    return resp.status, json.loads(resp.read())
-            except urllib.error.HTTPError as e:
+                resp, raw = _send(method, f"{_API_PREFIX}{path}", body, headers)
+            except (OSError, http.client.HTTPException) as e:
+                _drop_connection()
+                if not idempotent or attempt >= attempts:
+                    return 503, {"error": f"Request failed after {attempt} attempt(s): {e}"}
+            else:
+                if resp.status < 400:
+                    return resp.status, _loads(raw) if raw else {}
                 try:
-                    err_body = json.loads(e.read())
+                    err_body = _loads(raw)
                 except Exception:
-                    err_body = {"error": str(e)}
-                return e.code, err_body
-            except (TimeoutError, urllib.error.URLError) as e:
-                if attempt >= max(1, HTTP_RETRIES):
-                    return 503, {"error": f"Request failed after {attempt} attempt(s): {e}"}
-                time.sleep(min(2 * attempt, 5))
+                    err_body = {"error": f"HTTP Error {resp.status}: {resp.reason}"}
+                if (
+                    resp.status not in RETRYABLE_HTTP_CODES
+                    or (resp.status != 429 and not idempotent)
+                    or attempt >= attempts
+                ):
+                    return resp.status, err_body
+                if resp.status == 429:
+                    try:
+                        retry_after = float(resp.getheader("Retry-After", ""))
+                    except (TypeError, ValueError):
+                        retry_after = None
+            # Decorrelated jitter keeps concurrent callers from retrying in lockstep.
+            delay = random.uniform(RETRY_BASE_DELAY, min(RETRY_MAX_DELAY, delay * 3 or 0.4))
+            time.sleep(retry_after if retry_after is not None else delay)
 
 except ImportError:
     def _http(*args, **kwargs):  # type: ignore
-        raise RuntimeError("urllib not available")
+        raise RuntimeError("http.client not available")
+
+
+async def _ahttp(method: str, path: str, data: dict | None = None, token: str | None = None) -> tuple[int, dict]:
+    """Run a blocking ``_http`` call in a worker thread so callers can gather many at once."""
+    return await asyncio.to_thread(_http, method, path, data, token)
 
 
 def _log(msg: str) -> None:
@@ -122,7 +241,7 @@ def _device_from_lab_container(container: dict[str, Any]) -> dict[str, Any] | No
             "probe_port": 443,
             "config": {
                 "host": host,
-                "api_token": os.getenv("FORTINET_API_TOKEN", "fg-lab-token-001"),
+                "api_token": FORTINET_API_TOKEN,
                 "verify_ssl": False,
             },
             "sync_interval_minutes": 30,
@@ -136,7 +255,7 @@ def _device_from_lab_container(container: dict[str, Any]) -> dict[str, Any] | No
             "probe_port": 443,
             "config": {
                 "host": host,
-                "api_key": os.getenv("PALOALTO_API_KEY", "pa-lab-apikey-001"),
+                "api_key": PALOALTO_API_KEY,
                 "verify_ssl": False,
             },
             "sync_interval_minutes": 30,
@@ -150,15 +269,15 @@ def _device_from_lab_container(container: dict[str, Any]) -> dict[str, Any] | No
             "probe_port": 443,
             "config": {
                 "host": host,
-                "username": os.getenv("CHECKPOINT_USER", "admin"),
-                "password": os.getenv("CHECKPOINT_PASS", "Cp@ssw0rd!"),
+                "username": CHECKPOINT_USER,
+                "password": CHECKPOINT_PASS,
                 "verify_ssl": False,
             },
             "sync_interval_minutes": 60,
         }
 
     if type_id in {"cisco-ios", "cisco-nxos"}:
-        driver_type = "nxos" if type_id == "cisco-nxos" else os.getenv("CISCO_DRIVER_TYPE", os.getenv("CISCO_DRIVER", "ios"))
+        driver_type = "nxos" if type_id == "cisco-nxos" else CISCO_DRIVER_TYPE
         return {
             "name": f"{name} (Cisco {driver_type})",
             "connector_type": "cisco",
@@ -166,8 +285,8 @@ def _device_from_lab_container(container: dict[str, Any]) -> dict[str, Any] | No
             "probe_port": 22,
             "config": {
                 "host": host,
-                "username": os.getenv("CISCO_USER", "admin"),
-                "password": os.getenv("CISCO_PASS", "Cisco123!"),
+                "username": CISCO_USER,
+                "password": CISCO_PASS,
                 "driver_type": driver_type,
             },
             "sync_interval_minutes": 30,
@@ -181,8 +300,8 @@ def _device_from_lab_container(container: dict[str, Any]) -> dict[str, Any] | No
             "probe_port": 22,
             "config": {
                 "host": host,
-                "username": os.getenv("JUNIPER_USER", "admin"),
-                "password": os.getenv("JUNIPER_PASS", "Juniper123!"),
+                "username": JUNIPER_USER,
+                "password": JUNIPER_PASS,
             },
             "sync_interval_minutes": 30,
         }
@@ -217,54 +336,173 @@ def discover_devices(token: str) -> list[dict[str, Any]]:
 # Step 1: Start containers
 # ---------------------------------------------------------------------------
 
-def start_containers() -> None:
+def _use_pidfd_child_watcher() -> None:
+    """Wait for compose children through a pidfd on the event loop.
+
+    Python 3.12+ already does this; older interpreters default to a helper
+    thread blocked in ``waitpid`` per child.  Needs Linux >= 5.3.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, "pidfd_open"):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+    asyncio.set_child_watcher(asyncio.PidfdChildWatcher())
+
+
+async def _exec(*cmd: str, capture: bool = False) -> tuple[int, str]:
+    """Run a command without blocking the event loop; output streams to the
+    terminal unless ``capture`` is set."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE if capture else None,
+        stderr=asyncio.subprocess.DEVNULL if capture else None,
+    )
+    stdout, _ = await proc.communicate()
+    return proc.returncode, stdout.decode() if stdout else ""
+
+
+async def _images_missing(compose_file: Path) -> bool:
+    """True when any image referenced by the compose file is not built yet."""
+    code, out = await _exec("docker", "compose", "-f", str(compose_file), "config", "--images", capture=True)
+    if code != 0:
+        return True
+    images = out.split()
+    if not images:
+        return False
+    code, _ = await _exec("docker", "image", "inspect", *images, capture=True)
+    return code != 0
+
+
+async def start_containers(rebuild: bool = False) -> None:
     _header("Step 1 — Starting lab stack")
     compose_file = LAB_DIR / "docker-compose.yml"
     if not compose_file.exists():
         _err(f"docker-compose.yml not found at {compose_file}")
         sys.exit(1)
 
-    cmd = [
-        "docker", "compose",
-        "-f", str(compose_file),
-        "up", "-d", "--build",
-    ]
-
+    # Only pay for a build (context upload + cache checks) when asked to, or
+    # when an image is missing; compose builds the services in parallel.
+    if rebuild or await _images_missing(compose_file):
+        build_cmd = ["docker", "compose", "-f", str(compose_file), "build"]
+        _log(f"Running: {' '.join(build_cmd)}")
+        code, _ = await _exec(*build_cmd)
+        if code != 0:
+            _err("docker compose build failed — see output above")
+            sys.exit(1)
+
+    cmd = ["docker", "compose", "-f", str(compose_file), "up", "-d", "--no-build"]
     _log(f"Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=False, text=True)
-    if result.returncode != 0:
+    code, _ = await _exec(*cmd)
+    if code != 0:
         _err("docker compose up failed — see output above")
         sys.exit(1)
     _ok("Containers started (or already running)")
 
+    # Then let compose block on the healthchecks instead of polling ports
+    # from here. A service that stays red is not fatal: the port probe in
+    # step 3 reports it, and devices are registered either way.
+    wait_cmd = [*cmd, "--wait", "--wait-timeout", "60"]
+    _log(f"Running: {' '.join(wait_cmd)}")
+    code, _ = await _exec(*wait_cmd)
+    if code != 0:
+        _warn("Some healthchecks are not green yet — falling back to port probes")
+    else:
+        _ok("All healthchecks green")
+
 
 # ---------------------------------------------------------------------------
 # Step 2: Wait for ports
 # ---------------------------------------------------------------------------
 
-def _tcp_ready(host: str, port: int, timeout: float = 1.0) -> bool:
+@functools.lru_cache(maxsize=256)
+def _resolve(host: str, port: int) -> tuple[tuple[int, Any], ...]:
+    """Resolve ``host:port`` once per run; every probe sweep reuses the answer.
+
+    All ``(family, sockaddr)`` pairs are kept so a probe can try each of
+    them, as ``socket.create_connection`` does.
+    """
+    return tuple(
+        (family, addr)
+        for family, _, _, _, addr in socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM)
+    )
+
+
+def _probe_ready(devices: list[dict[str, Any]], timeout: float = 1.0) -> set[int]:
+    """Probe every device's service port concurrently.
+
+    One non-blocking connect is issued per resolved address of each device
+    and all of them are multiplexed on a single selector, so a sweep costs
+    one timeout instead of one timeout per unreachable device.  Returns the
+    indices of the devices that accepted a connection on any address.
+    """
+    ready: set[int] = set()
+    sel = selectors.DefaultSelector()
     try:
-        with socket.create_connection((host, port), timeout=timeout):
-            return True
-    except (OSError, ConnectionRefusedError, socket.timeout):
-        return False
-
-
-def wait_for_devices(devices: list[dict[str, Any]], max_wait: int = 60) -> None:
+        for idx, d in enumerate(devices):
+            try:
+                addrs = _resolve(d["host"], d["probe_port"])
+            except OSError:
+                continue
+            for family, addr in addrs:
+                try:
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                except OSError:
+                    continue
+                sock.setblocking(False)
+                err = sock.connect_ex(addr)
+                if err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    sel.register(sock, selectors.EVENT_WRITE, idx)
+                    continue
+                sock.close()
+                if err == 0:
+                    ready.add(idx)
+                    break
+
+        deadline = time.monotonic() + timeout
+        while sel.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in sel.select(remaining):
+                sock = key.fileobj
+                if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    ready.add(key.data)
+                sel.unregister(sock)
+                sock.close()
+            # Drop the other addresses of devices that are already reachable.
+            for key in [k for k in sel.get_map().values() if k.data in ready]:
+                sel.unregister(key.fileobj)
+                key.fileobj.close()
+    finally:
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()
+        sel.close()
+    return ready
+
+
+def wait_for_devices(devices: list[dict[str, Any]], max_wait: int = DEVICE_WAIT) -> None:
     _header("Step 3 — Waiting for devices to be reachable")
+    _resolve.cache_clear()  # container IPs may have changed since the last run
     deadline = time.time() + max_wait
     pending = list(devices)
+    delay = PROBE_MIN_DELAY
 
     while pending and time.time() < deadline:
+        ready = _probe_ready(pending)
         still_pending = []
-        for d in pending:
-            if _tcp_ready(d["host"], d["probe_port"]):
+        for idx, d in enumerate(pending):
+            if idx in ready:
                 _ok(f"{d['name']} reachable at {d['host']}:{d['probe_port']}")
             else:
                 still_pending.append(d)
         pending = still_pending
         if pending:
-            time.sleep(3)
+            # Poll quickly while devices keep coming up, back off (with
+            # jitter) while nothing changes.
+            delay = PROBE_MIN_DELAY if ready else min(PROBE_MAX_DELAY, delay * 1.7)
+            time.sleep(min(delay + random.uniform(0, delay * 0.2), max(0.0, deadline - time.time())))
 
     for d in pending:
         _warn(f"{d['name']} NOT reachable at {d['host']}:{d['probe_port']} — will register anyway")
@@ -274,13 +512,73 @@ def wait_for_devices(devices: list[dict[str, Any]], max_wait: int = 60) -> None:
 # Step 3: Authenticate against deplyx API
 # ---------------------------------------------------------------------------
 
+# Connector listing fetched while validating a cached token; reused by
+# register_connectors so a rerun does not GET /connectors twice.
+_connectors_cache: list[dict[str, Any]] | None = None
+
+
+def _token_expiry(token: str) -> float:
+    """Read the ``exp`` claim from a JWT without verifying it (fallback: ~1h)."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + 3500
+
+
+def _load_cached_token() -> str | None:
+    global _connectors_cache
+    try:
+        cached = json.loads(TOKEN_CACHE.read_text())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict):
+        return None
+    if cached.get("api") != DEPLYX_API or cached.get("email") != ADMIN_EMAIL:
+        return None
+    token = cached.get("token")
+    if not token or float(cached.get("exp", 0)) <= time.time() + 60:
+        return None
+
+    status, body = _http("GET", "/connectors", token=token)
+    if status != 200:
+        return None
+    if isinstance(body, list):
+        _connectors_cache = body
+    return token
+
+
+def _store_token(token: str) -> None:
+    try:
+        # Created 0600 up front so the bearer token is never readable by
+        # others; fchmod also tightens a cache left by an older run.
+        fd = os.open(TOKEN_CACHE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            os.fchmod(fd, 0o600)
+            f.write(json.dumps({
+                "api": DEPLYX_API,
+                "email": ADMIN_EMAIL,
+                "token": token,
+                "exp": _token_expiry(token),
+            }))
+    except OSError:
+        pass
+
+
 def authenticate() -> str:
     _header("Step 2 — Authenticating with deplyx API")
 
+    token = _load_cached_token()
+    if token:
+        _ok(f"Reusing cached token for {ADMIN_EMAIL}")
+        return token
+
     # Try login first
     status, body = _http("POST", "/auth/login", {"email": ADMIN_EMAIL, "password": ADMIN_PASS})
     if status == 200:
         token = body.get("access_token", "")
+        _store_token(token)
         _ok(f"Logged in as {ADMIN_EMAIL}")
         return token
 
@@ -294,6 +592,7 @@ def authenticate() -> str:
         })
         if status in (200, 201):
             token = body.get("access_token", "")
+            _store_token(token)
             _ok(f"Registered and logged in as {ADMIN_EMAIL}")
             return token
 
@@ -306,52 +605,69 @@ def authenticate() -> str:
 # Step 4: Register connectors
 # ---------------------------------------------------------------------------
 
-def register_connectors(token: str, devices: list[dict[str, Any]]) -> list[int]:
-    _header("Step 4 — Registering connectors")
-
-    # List existing connectors to avoid duplicates
-    _, existing_list = _http("GET", "/connectors", token=token)
-    existing = {c["name"]: c for c in (existing_list if isinstance(existing_list, list) else [])}
+async def _register_one(token: str, d: dict[str, Any], existing: dict[str, dict[str, Any]]) -> int | None:
+    payload = {
+        "name": d["name"],
+        "connector_type": d["connector_type"],
+        "config": d["config"],
+        "sync_mode": "on-demand",
+        "sync_interval_minutes": d.get("sync_interval_minutes", 60),
+    }
+
+    if d["name"] in existing:
+        current = existing[d["name"]]
+        conn_id = current["id"]
+        # The listing already carries the stored settings — skip the PUT
+        # (and its DB write) when nothing would change.
+        if {k: current.get(k) for k in payload} == payload:
+            _ok(f"Unchanged connector: {d['name']} (id={conn_id})")
+            return conn_id
+        status, body = await _ahttp("PUT", f"/connectors/{conn_id}", payload, token=token)
+        if status == 200:
+            _ok(f"Updated connector: {d['name']} (id={conn_id})")
+        else:
+            _warn(f"Update failed for {d['name']}: {status} — {body}")
+        return conn_id
+
+    status, body = await _ahttp("POST", "/connectors", payload, token=token)
+    if status == 201:
+        conn_id = body["id"]
+        _ok(f"Created connector: {d['name']} (id={conn_id})")
+        return conn_id
+    _warn(f"Create failed for {d['name']}: {status} — {body}")
+    return None
 
-    connector_ids = []
-    for d in devices:
-        payload = {
-            "name": d["name"],
-            "connector_type": d["connector_type"],
-            "config": d["config"],
-            "sync_mode": "on-demand",
-            "sync_interval_minutes": d.get("sync_interval_minutes", 60),
-        }
 
-        if d["name"] in existing:
-            conn_id = existing[d["name"]]["id"]
-            status, body = _http("PUT", f"/connectors/{conn_id}", payload, token=token)
-            if status == 200:
-                _ok(f"Updated connector: {d['name']} (id={conn_id})")
-            else:
-                _warn(f"Update failed for {d['name']}: {status} — {body}")
-        else:
-            status, body = _http("POST", "/connectors", payload, token=token)
-            if status == 201:
-                conn_id = body["id"]
-                _ok(f"Created connector: {d['name']} (id={conn_id})")
-            else:
-                _warn(f"Create failed for {d['name']}: {status} — {body}")
-                continue
+async def register_connectors(token: str, devices: list[dict[str, Any]]) -> list[int]:
+    _header("Step 4 — Registering connectors")
 
-        connector_ids.append(conn_id)
+    # List existing connectors to avoid duplicates (reuse the listing fetched
+    # while validating a cached token, if any)
+    existing_list = _connectors_cache
+    if existing_list is None:
+        _, existing_list = await _ahttp("GET", "/connectors", token=token)
+    existing = {c["name"]: c for c in (existing_list if isinstance(existing_list, list) else [])}
 
-    return connector_ids
+    # One request per device, issued concurrently; gather keeps device order.
+    results = await asyncio.gather(*(_register_one(token, d, existing) for d in devices))
+    return [conn_id for conn_id in results if conn_id is not None]
 
 
 # ---------------------------------------------------------------------------
 # Step 5: Initial sync
 # ---------------------------------------------------------------------------
 
-def initial_sync(token: str, connector_ids: list[int]) -> None:
+async def _sync_one(conn_id: int, token: str) -> tuple[int, int, dict]:
+    status, body = await _ahttp("POST", f"/connectors/{conn_id}/sync", token=token)
+    return conn_id, status, body
+
+
+async def initial_sync(token: str, connector_ids: list[int]) -> None:
     _header("Step 5 — Triggering initial sync on each connector")
-    for conn_id in connector_ids:
-        status, body = _http("POST", f"/connectors/{conn_id}/sync", token=token)
+    # All syncs are in flight at once (wall time ~ the slowest sync); each
+    # result is reported as soon as it lands rather than after the last one.
+    for fut in asyncio.as_completed([_sync_one(conn_id, token) for conn_id in connector_ids]):
+        conn_id, status, body = await fut
         vendor = body.get("vendor", f"connector-{conn_id}")
         sync_status = body.get("status", "?")
         synced = body.get("synced", {})
@@ -367,7 +683,24 @@ def initial_sync(token: str, connector_ids: list[int]) -> None:
 # Entry point
 # ---------------------------------------------------------------------------
 
+async def _run(rebuild: bool) -> list[int]:
+    # Authentication only needs the deplyx backend, not the lab containers,
+    # so it overlaps with docker compose bringing the lab up.
+    compose = asyncio.create_task(start_containers(rebuild=rebuild))
+    token = await asyncio.to_thread(authenticate)
+    await compose
+    devices = await asyncio.to_thread(discover_devices, token)
+    await asyncio.to_thread(wait_for_devices, devices)
+    ids = await register_connectors(token, devices)
+    await initial_sync(token, ids)
+    return ids
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Start the lab and register its devices with deplyx.")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the mock images before starting them")
+    args = parser.parse_args()
+
     print("\n" + "=" * 60)
     print("  Deplyx Lab — build-topology")
     print("=" * 60)
@@ -375,12 +708,8 @@ def main() -> None:
     print(f"  User:  {ADMIN_EMAIL}")
     print(f"  Lab:   {LAB_DIR}")
 
-    start_containers()
-    token = authenticate()
-    devices = discover_devices(token)
-    wait_for_devices(devices)
-    ids = register_connectors(token, devices)
-    initial_sync(token, ids)
+    _use_pidfd_child_watcher()
+    ids = asyncio.run(_run(args.rebuild))
 
     _header("Done")
     print(f"\n  {len(ids)} connectors registered and synced.")
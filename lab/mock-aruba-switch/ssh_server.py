@@ -1,12 +1,25 @@
 """Mock ArubaOS CX Switch SSH server."""
-import os, threading, signal, sys, socket
+import os, threading, signal, socket, selectors
+from concurrent.futures import ThreadPoolExecutor
 import paramiko
 
-HOST_KEY = paramiko.RSAKey.generate(2048)
+HOST_KEY_PATH = os.getenv("HOST_KEY_PATH", "/etc/ssh/mock_host_rsa")
+
+
+def _load_host_key():
+    # The key is baked into the image at build time; generating a 2048-bit
+    # RSA key on every start only delays the port becoming reachable.
+    try: return paramiko.RSAKey(filename=HOST_KEY_PATH)
+    except (OSError, paramiko.SSHException): return paramiko.RSAKey.generate(2048)
+
+
+HOST_KEY = _load_host_key()
 HOSTNAME = os.getenv("ARUBA_HOSTNAME", "ARUBA-CX-CORE-01")
 SSH_PORT = int(os.getenv("SSH_PORT", "22"))
 SSH_USER = os.getenv("SSH_USER", "admin")
 SSH_PASS = os.getenv("SSH_PASS", "Aruba123!")
+MAX_SSH_CONNS = int(os.getenv("MAX_SSH_CONNS", "32"))
+SSH_WORKERS = int(os.getenv("SSH_WORKERS", "1"))
 
 COMMANDS = {
     "show version": f"""ArubaOS-CX
@@ -73,6 +86,16 @@ Port            State           Role     Cost  Priority  Type
 {HOSTNAME}# """,
 }
 
+# Keys lowercased once at import, longest first so the first hit is the
+# longest matching prefix.  Replies are encoded once too: the raw body for
+# exec requests and the CRLF-framed body for the interactive shell.
+_CMDS_LC = sorted(
+    ((k.lower(), v.encode(), f"\r\n{v}\r\n".encode()) for k, v in COMMANDS.items()),
+    key=lambda kv: -len(kv[0]),
+)
+_PROMPT = f"\r\n{HOSTNAME}# ".encode()
+_NOT_FOUND_TAIL = f"\r\n{HOSTNAME}# \r\n".encode()
+
 
 class MockSSH(paramiko.ServerInterface):
     def __init__(self):
@@ -90,19 +113,69 @@ class MockSSH(paramiko.ServerInterface):
     def check_auth_publickey(self, username, key): return paramiko.AUTH_SUCCESSFUL
 
 
-def handle_client(sock, addr):
+# Interactive shells are multiplexed on one selector driven by a single
+# reactor thread, so an idle session costs no thread of its own.  Created
+# per process in serve_forever() so forked workers never share an epoll fd.
+_SEL = None
+
+
+class _Session:
+    __slots__ = ("t", "ch", "buf", "on_close")
+    def __init__(self, t, ch, on_close): self.t, self.ch, self.buf, self.on_close = t, ch, bytearray(), on_close
+    def close(self):
+        try: _SEL.unregister(self.ch)
+        except (KeyError, ValueError): pass
+        try: self.ch.close()
+        except: pass
+        self.t.close()
+        self.on_close()
+
+
+def _process(sess):
+    data = sess.ch.recv(4096)
+    if not data: sess.close(); return
+    # One growable buffer per session: complete lines are cut off the front
+    # in place instead of re-allocating the remainder on every split.
+    sess.buf.extend(data)
+    while (idx := sess.buf.find(b"\n")) >= 0:
+        line = bytes(sess.buf[:idx]); del sess.buf[:idx + 1]
+        cmd = line.decode("utf-8", errors="ignore").strip().rstrip("\r")
+        if not cmd: sess.ch.sendall(_PROMPT); continue
+        if cmd in ("exit", "quit"): sess.close(); return
+        cmd_lc = cmd.lower()
+        resp = next((framed for k, _, framed in _CMDS_LC if cmd_lc.startswith(k)), None)
+        sess.ch.sendall(resp if resp is not None else b"\r\nCommand not found: " + cmd.encode() + _NOT_FOUND_TAIL)
+
+
+def _reactor():
+    while True:
+        for key, _ in _SEL.select(timeout=1):
+            try: _process(key.data)
+            except Exception: key.data.close()
+
+
+def handle_client(sock, addr, on_close=lambda: None):
+    """Negotiate SSH and answer exec requests; returns True once an
+    interactive shell has been handed to the reactor (which then owns
+    ``on_close``)."""
+    # Interactive replies are small writes: disable Nagle so they are not
+    # held back waiting for the client's delayed ACK.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
     t = paramiko.Transport(sock)
     t.add_server_key(HOST_KEY)
     server = MockSSH()
     t.start_server(server=server)
     ch = t.accept(30)
-    if not ch: t.close(); return
+    if not ch: t.close(); return False
     server._ready.wait(timeout=5)
     if server.exec_command is not None:
         cmd = server.exec_command
-        resp = next((v for k, v in COMMANDS.items() if cmd.lower().startswith(k.lower())), f"Command not found: {cmd}\n")
+        cmd_lc = cmd.lower()
+        resp = next((raw for k, raw, _ in _CMDS_LC if cmd_lc.startswith(k)), None)
+        if resp is None: resp = f"Command not found: {cmd}\n".encode()
         try:
-            ch.sendall(resp.encode() if resp else b"\n")
+            ch.sendall(resp)
             ch.send_exit_status(0)
         except Exception:
             pass
@@ -110,39 +183,88 @@ def handle_client(sock, addr):
             try: ch.close()
             except: pass
             t.close()
-        return
+        return False
     try:
-        ch.sendall(f"\r\n{HOSTNAME}# ".encode())
-        buf = b""
-        while True:
-            data = ch.recv(4096)
-            if not data: break
-            buf += data
-            while b"\n" in buf:
-                line, buf = buf.split(b"\n", 1)
-                cmd = line.decode("utf-8", errors="ignore").strip().rstrip("\r")
-                if not cmd: ch.sendall(f"\r\n{HOSTNAME}# ".encode()); continue
-                if cmd in ("exit", "quit"): return
-                resp = next((v for k, v in COMMANDS.items() if cmd.lower().startswith(k.lower())), f"Command not found: {cmd}\r\n{HOSTNAME}# ")
-                ch.sendall(f"\r\n{resp}\r\n".encode())
-    except Exception: pass
-    finally:
+        ch.sendall(_PROMPT)
+        ch.settimeout(5)
+        _SEL.register(ch, selectors.EVENT_READ, _Session(t, ch, on_close))
+        return True
+    except Exception:
         try: ch.close()
         except: pass
         t.close()
+        return False
 
 
-def main():
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", SSH_PORT)); s.listen(5)
-    print(f"[Mock Aruba CX {HOSTNAME}] Listening on :{SSH_PORT}")
-    signal.signal(signal.SIGTERM, lambda *_: (s.close(), sys.exit(0)))
-    signal.signal(signal.SIGINT, lambda *_: (s.close(), sys.exit(0)))
+def _bind(family, host):
+    s = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # SO_REUSEPORT lets each forked worker bind its own listener on the same
+        # port; the kernel then spreads incoming connections across them.
+        if hasattr(socket, "SO_REUSEPORT"):
+            try: s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError: pass
+        # Dual-stack: one IPv6 socket also accepts IPv4 (v4-mapped) clients.
+        if family == socket.AF_INET6: s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        s.bind((host, SSH_PORT))
+    except OSError:
+        s.close(); raise
+    return s
+
+
+def _listen():
+    try: s = _bind(socket.AF_INET6, "::")
+    except OSError: s = _bind(socket.AF_INET, "0.0.0.0")
+    s.listen(128)
+    return s
+
+
+def serve_forever(s):
+    global _SEL
+    _SEL = selectors.DefaultSelector()
+    # Pool workers are not daemon threads; exit hard so an idle session
+    # cannot hold the container open on shutdown.
+    signal.signal(signal.SIGTERM, lambda *_: (s.close(), os._exit(0)))
+    signal.signal(signal.SIGINT, lambda *_: (s.close(), os._exit(0)))
+    # Bounded worker pool: connections beyond MAX_SSH_CONNS are refused
+    # instead of spawning an unbounded number of handler threads.
+    pool = ThreadPoolExecutor(max_workers=MAX_SSH_CONNS)
+    slots = threading.BoundedSemaphore(MAX_SSH_CONNS)
+    def serve(c, a):
+        handed_off = False
+        try: handed_off = handle_client(c, a, slots.release)
+        finally:
+            if not handed_off: slots.release()
+    threading.Thread(target=_reactor, daemon=True).start()
     while True:
         try:
             c, a = s.accept()
-            threading.Thread(target=handle_client, args=(c, a), daemon=True).start()
+            if not slots.acquire(blocking=False): c.close(); continue
+            pool.submit(serve, c, a)
         except OSError: break
 
+
+def main():
+    if SSH_WORKERS <= 1:
+        s = _listen()
+        print(f"[Mock Aruba CX {HOSTNAME}] Listening on :{SSH_PORT}")
+        serve_forever(s)
+        return
+    children = []
+    for _ in range(SSH_WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            serve_forever(_listen()); os._exit(0)
+        children.append(pid)
+    print(f"[Mock Aruba CX {HOSTNAME}] Listening on :{SSH_PORT} ({SSH_WORKERS} workers)")
+    def stop(*_):
+        for pid in children:
+            try: os.kill(pid, signal.SIGTERM)
+            except OSError: pass
+        os._exit(0)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in children: os.wait()
+
 if __name__ == "__main__": main()
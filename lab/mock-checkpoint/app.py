@@ -9,35 +9,85 @@ Simulates the Check Point Web API endpoints used by the deplyx CheckPointConnect
   - POST /web_api/set-access-rule      → modify rule
 """
 
+# gevent must patch the stdlib before anything else imports socket/ssl.
+from gevent import monkey
+
+monkey.patch_all()
+
+import base64
+import functools
 import os
+import time
 import uuid
-from flask import Flask, request, jsonify
+
+import orjson
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+from gevent.pywsgi import WSGIServer
+from werkzeug.serving import make_ssl_devcert
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Route Flask's own JSON handling (request.get_json, jsonify) through orjson."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+
+def _json(data, status=200):
+    """Serialize with orjson (much faster than jsonify on the rulebase lists)."""
+    return Response(orjson.dumps(data), status=status, mimetype="application/json")
 
 USERNAME = os.getenv("CHECKPOINT_USER", "admin")
 PASSWORD = os.getenv("CHECKPOINT_PASS", "Cp@ssw0rd!")
 HOSTNAME = os.getenv("CHECKPOINT_HOSTNAME", "CP-MGMT-01")
+API_PORT = int(os.getenv("API_PORT", "443"))
+TLS_CERT_BASE = os.getenv("TLS_CERT_BASE", "/tmp/checkpoint-mock")
 
-# Active sessions
-_sessions: dict[str, dict] = {}
+
+def _uid():
+    """Random 22-char id; skips the hyphenated formatting of str(uuid4())."""
+    return base64.urlsafe_b64encode(uuid.uuid4().bytes).rstrip(b"=").decode()
+
+
+SESSION_TIMEOUT = 600  # seconds, as advertised by login
+MAX_SESSIONS = 256  # oldest live sessions are evicted beyond this
+
+# Active sessions: sid → (expiry on the monotonic clock, session info)
+_sessions: dict[str, tuple[float, dict]] = {}
 
 # ---------- Auth ----------
 
 @app.route("/web_api/login", methods=["POST"])
 def login():
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     user = data.get("user", "")
     pwd = data.get("password", "")
     if user != USERNAME or pwd != PASSWORD:
-        return jsonify({"code": "err_login_failed", "message": "Authentication failed"}), 403
-    sid = str(uuid.uuid4())
-    _sessions[sid] = {"user": user, "domain": data.get("domain", "")}
-    return jsonify({
+        return _json({"code": "err_login_failed", "message": "Authentication failed"}, 403)
+    now = time.monotonic()
+    # Every session gets the same timeout, so insertion order is expiry order:
+    # drop expired sids from the front, then the oldest live ones past the cap,
+    # so clients that never log out cannot grow the table without bound.
+    while _sessions:
+        oldest = next(iter(_sessions))
+        if _sessions[oldest][0] >= now and len(_sessions) < MAX_SESSIONS:
+            break
+        del _sessions[oldest]
+    sid = _uid()
+    _sessions[sid] = (now + SESSION_TIMEOUT, {"user": user, "domain": data.get("domain", "")})
+    return _json({
         "sid": sid,
         "uid": "user-001",
         "url": f"https://{HOSTNAME}/web_api",
-        "session-timeout": 600,
+        "session-timeout": SESSION_TIMEOUT,
         "api-server-version": "1.9",
     })
 
@@ -46,14 +96,23 @@ def login():
 def logout():
     sid = request.headers.get("X-chkp-sid", "")
     _sessions.pop(sid, None)
-    return jsonify({"message": "OK"})
+    return _json({"message": "OK"})
 
 
-def _check_session():
-    sid = request.headers.get("X-chkp-sid", "")
-    if sid not in _sessions:
-        return jsonify({"code": "err_not_authenticated", "message": "Not authenticated"}), 401
-    return None
+_ERR_401 = orjson.dumps({"code": "err_not_authenticated", "message": "Not authenticated"})
+
+
+def _require_session(view):
+    """Answer 401 unless the request's X-chkp-sid names a live session."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        sid = request.headers.get("X-chkp-sid", "")
+        session = _sessions.get(sid)
+        if session is None or session[0] < time.monotonic():
+            _sessions.pop(sid, None)  # drop it if it merely expired
+            return Response(_ERR_401, status=401, mimetype="application/json")
+        return view(*args, **kwargs)
+    return wrapper
 
 
 # ---------- Gateways ----------
@@ -85,17 +144,19 @@ GATEWAYS = [
 ]
 
 
+# GATEWAYS never changes: serialize the response body once.
+_GATEWAYS_BYTES = orjson.dumps({
+    "objects": GATEWAYS,
+    "from": 1,
+    "to": len(GATEWAYS),
+    "total": len(GATEWAYS),
+})
+
+
 @app.route("/web_api/show-simple-gateways", methods=["POST"])
+@_require_session
 def show_gateways():
-    err = _check_session()
-    if err:
-        return err
-    return jsonify({
-        "objects": GATEWAYS,
-        "from": 1,
-        "to": len(GATEWAYS),
-        "total": len(GATEWAYS),
-    })
+    return Response(_GATEWAYS_BYTES, mimetype="application/json")
 
 
 # ---------- Access Rulebase ----------
@@ -168,68 +229,88 @@ RULEBASE = [
 ]
 
 
+# uid → rulebase entry, so set-access-rule is a hash lookup, not a scan.
+_rule_index: dict[str, dict] = {r["uid"]: r for r in RULEBASE}
+
+# Serialized show-access-rulebase bodies keyed by policy name; cleared
+# whenever a rule is added or modified.
+_rulebase_bytes_cache: dict[str, bytes] = {}
+
+
 @app.route("/web_api/show-access-rulebase", methods=["POST"])
+@_require_session
 def show_access_rulebase():
-    err = _check_session()
-    if err:
-        return err
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     policy_name = data.get("name", "Network")
-    return jsonify({
-        "uid": "rulebase-001",
-        "name": policy_name,
-        "rulebase": RULEBASE,
-        "from": 1,
-        "to": len(RULEBASE),
-        "total": len(RULEBASE),
-    })
+    body = _rulebase_bytes_cache.get(policy_name)
+    if body is None:
+        if len(_rulebase_bytes_cache) >= 32:
+            _rulebase_bytes_cache.clear()
+        body = _rulebase_bytes_cache[policy_name] = orjson.dumps({
+            "uid": "rulebase-001",
+            "name": policy_name,
+            "rulebase": RULEBASE,
+            "from": 1,
+            "to": len(RULEBASE),
+            "total": len(RULEBASE),
+        })
+    return Response(body, mimetype="application/json")
+
+
+def _rule_defaults():
+    """Field defaults for add-access-rule, built fresh so no two rules share
+    a nested list or dict."""
+    return {
+        "type": "access-rule",
+        "name": "New-Rule",
+        "source": [{"name": "Any"}],
+        "destination": [{"name": "Any"}],
+        "service": [{"name": "Any"}],
+        "action": {"name": "Drop"},
+        "track": {"type": {"name": "Log"}},
+        "enabled": True,
+        "comments": "",
+    }
+
+
+# Fields a client may set on creation; the rest always take the default.
+_RULE_FIELDS = frozenset({"name", "source", "destination", "service", "action", "comments"})
 
 
 @app.route("/web_api/add-access-rule", methods=["POST"])
+@_require_session
 def add_access_rule():
-    err = _check_session()
-    if err:
-        return err
-    data = request.json or {}
+    data = request.get_json(silent=True) or {}
     new_rule = {
         "uid": f"rule-cp-{uuid.uuid4().hex[:6]}",
-        "type": "access-rule",
-        "name": data.get("name", "New-Rule"),
-        "source": data.get("source", [{"name": "Any"}]),
-        "destination": data.get("destination", [{"name": "Any"}]),
-        "service": data.get("service", [{"name": "Any"}]),
-        "action": data.get("action", {"name": "Drop"}),
-        "track": {"type": {"name": "Log"}},
-        "enabled": True,
-        "comments": data.get("comments", ""),
+        **_rule_defaults(),
+        **{k: data[k] for k in data.keys() & _RULE_FIELDS},
     }
     RULEBASE.insert(-1, new_rule)  # Before the section
-    return jsonify(new_rule)
+    _rule_index.setdefault(new_rule["uid"], new_rule)  # first match wins, as with a scan
+    _rulebase_bytes_cache.clear()
+    return _json(new_rule)
 
 
 @app.route("/web_api/set-access-rule", methods=["POST"])
+@_require_session
 def set_access_rule():
-    err = _check_session()
-    if err:
-        return err
-    data = request.json or {}
-    rule_uid = data.get("uid", "")
-    for rule in RULEBASE:
-        if rule.get("uid") == rule_uid:
-            rule.update({k: v for k, v in data.items() if k != "uid"})
-            return jsonify(rule)
-    return jsonify({"code": "generic_err_object_not_found", "message": "Rule not found"}), 404
+    data = request.get_json(silent=True) or {}
+    rule = _rule_index.get(data.get("uid", ""))
+    if rule is not None:
+        rule.update({k: v for k, v in data.items() if k != "uid"})
+        _rulebase_bytes_cache.clear()
+        return _json(rule)
+    return _json({"code": "generic_err_object_not_found", "message": "Rule not found"}, 404)
 
 
 # ---------- Publish ----------
 @app.route("/web_api/publish", methods=["POST"])
+@_require_session
 def publish():
     """Commit staged policy changes — called by checkpoint.py apply_change."""
-    err = _check_session()
-    if err:
-        return err
-    task_id = str(uuid.uuid4())
-    return jsonify({
+    task_id = _uid()
+    return _json({
         "uid": task_id,
         "task-id": task_id,
         "progress-percentage": 100,
@@ -240,4 +321,11 @@ def publish():
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=443, ssl_context="adhoc")
+    # gevent serves requests concurrently on greenlets; the Werkzeug dev
+    # server handled them one at a time. Its handler also keeps HTTP/1.1
+    # connections alive, so a connector's show/add/set/publish burst reuses
+    # one TLS session instead of handshaking per call.
+    cert_file, key_file = f"{TLS_CERT_BASE}.crt", f"{TLS_CERT_BASE}.key"
+    if not (os.path.exists(cert_file) and os.path.exists(key_file)):
+        cert_file, key_file = make_ssl_devcert(TLS_CERT_BASE, host=HOSTNAME)
+    WSGIServer(("0.0.0.0", API_PORT), app, keyfile=key_file, certfile=cert_file).serve_forever()
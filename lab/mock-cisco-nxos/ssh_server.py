@@ -1,12 +1,28 @@
 """Mock Cisco NX-OS SSH server (Nexus 9000)."""
-import os, threading, signal, sys, socket
+import os, queue, threading, signal, sys, socket, selectors, time, collections
 import paramiko
 
-HOST_KEY = paramiko.RSAKey.generate(2048)
+HOST_KEY_PATH = os.getenv("HOST_KEY_PATH", "/tmp/mock_ssh_host_rsa")
+
+
+def _load_or_generate_host_key(path=HOST_KEY_PATH):
+    # Generating a 2048-bit RSA key costs seconds of CPU; do it once per container.
+    try: return paramiko.RSAKey(filename=path)
+    except (OSError, paramiko.SSHException):
+        key = paramiko.RSAKey.generate(2048)
+        try: key.write_private_key_file(path)
+        except OSError: pass
+        return key
+
+
+HOST_KEY = _load_or_generate_host_key()
 HOSTNAME = os.getenv("NXOS_HOSTNAME", "NXOS-DC1-01")
 SSH_PORT = int(os.getenv("SSH_PORT", "22"))
 SSH_USER = os.getenv("SSH_USER", "admin")
 SSH_PASS = os.getenv("SSH_PASS", "Cisco123!")
+# Each connection holds one paramiko transport thread; past this many live
+# ones, new connections are refused rather than spawning more.
+MAX_SSH_CONNS = int(os.getenv("MAX_SSH_CONNS", "64"))
 
 SHOW_VERSION = f"""Cisco Nexus Operating System (NX-OS) Software
 TAC support: http://www.cisco.com/tac
@@ -28,7 +44,7 @@ Hardware
   bootflash:   56623104 kB
 Kernel uptime is 183 day(s), 6 hour(s), 15 minute(s), 22 second(s)
 
-{HOSTNAME}# """
+{HOSTNAME}# """.encode()
 
 SHOW_INTERFACES = f"""Ethernet1/1 is up
   Hardware: 100/1000/10000/100000 Ethernet, address: 0050.5600.0101
@@ -55,7 +71,7 @@ mgmt0 is up
   Description: OOB-MANAGEMENT
   Internet address is 172.16.99.10/24
 
-{HOSTNAME}# """
+{HOSTNAME}# """.encode()
 
 SHOW_VLAN = f"""VLAN Name                             Status    Ports
 ---- -------------------------------- --------- -------------------------------
@@ -67,7 +83,7 @@ SHOW_VLAN = f"""VLAN Name                             Status    Ports
 100  DATABASE                         active    
 200  BACKUP                           active    
 
-{HOSTNAME}# """
+{HOSTNAME}# """.encode()
 
 SHOW_BGP = f"""BGP summary information for VRF default, address family IPv4 Unicast
 BGP router identifier 10.0.255.10, local AS number 65010
@@ -77,7 +93,7 @@ Neighbor        V    AS    MsgRcvd    MsgSent   TblVer  InQ OutQ Up/Down  State/
 10.0.255.1      4 65000      88450      88449      245    0    0 183d06h          24
 10.0.255.2      4 65000      88445      88443      245    0    0 183d06h          24
 
-{HOSTNAME}# """
+{HOSTNAME}# """.encode()
 
 SHOW_VRF = f"""VRF-Name                           VRF-ID State   Reason
 default                                 1 Up      --
@@ -85,7 +101,7 @@ management                              2 Up      --
 PROD                                    3 Up      --
 STORAGE                                 4 Up      --
 
-{HOSTNAME}# """
+{HOSTNAME}# """.encode()
 
 COMMAND_MAP = {
     "show version": SHOW_VERSION,
@@ -93,77 +109,152 @@ COMMAND_MAP = {
     "show vlan": SHOW_VLAN,
     "show bgp summary": SHOW_BGP,
     "show vrf": SHOW_VRF,
-    "show running-config": f"! NX-OS Running Config\nhostname {HOSTNAME}\n\nfeature bgp\nfeature ospf\nfeature vpc\n\nvlan 10\n  name SERVERS\nvlan 20\n  name STORAGE\n\n{HOSTNAME}# ",
-    "terminal length 0": "",
-    "terminal width 511": "",
+    "show running-config": f"! NX-OS Running Config\nhostname {HOSTNAME}\n\nfeature bgp\nfeature ospf\nfeature vpc\n\nvlan 10\n  name SERVERS\nvlan 20\n  name STORAGE\n\n{HOSTNAME}# ".encode(),
+    "terminal length 0": b"",
+    "terminal width 511": b"",
 }
+PROMPT_BYTES = f"\r\n{HOSTNAME}# ".encode()
+# (pattern, exec output, shell frame after the echo), longest prefix first.
+_PATTERNS = sorted(
+    ((k.lower(), v, b"\r\n" + v + b"\r\n" if v else PROMPT_BYTES) for k, v in COMMAND_MAP.items()),
+    key=lambda p: -len(p[0]),
+)
 
 
 class MockSSH(paramiko.ServerInterface):
-    def __init__(self):
-        super().__init__()
-        self.exec_command = None
-        self._ready = threading.Event()
+    # Called on paramiko's transport thread: shell and exec requests hand
+    # their channel straight to the reactor, so no thread of ours waits in
+    # t.accept() for the client to get around to opening one.
     def check_channel_request(self, kind, chanid): return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
     def check_auth_password(self, username, password): return paramiko.AUTH_SUCCESSFUL if username == SSH_USER and password == SSH_PASS else paramiko.AUTH_FAILED
     def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes): return True
-    def check_channel_shell_request(self, channel): self._ready.set(); return True
+    def check_channel_shell_request(self, channel): _handoff(channel, None); return True
     def check_channel_exec_request(self, channel, command):
-        self.exec_command = command.decode("utf-8", errors="ignore").strip()
-        self._ready.set()
+        _handoff(channel, command.decode("utf-8", errors="ignore").strip())
         return True
     def get_allowed_auths(self, username): return "password,publickey"
     def check_auth_publickey(self, username, key): return paramiko.AUTH_SUCCESSFUL
 
 
+# Every channel is served from one selector driven by a single reactor
+# thread; the only per-connection thread left is paramiko's own transport.
+# New channels are queued by _handoff and picked up when the wake socket
+# turns readable.
+_SEL = selectors.DefaultSelector()
+_PENDING = queue.SimpleQueue()
+_WAKE_R, _WAKE_W = socket.socketpair()
+_WAKE_R.setblocking(False); _WAKE_W.setblocking(False)
+_SEL.register(_WAKE_R, selectors.EVENT_READ)
+EXEC_LINGER = 0.25  # longest an answered exec channel waits for the client to close
+_lingering = collections.deque()  # (deadline, exec session), oldest first
+# A connection that has not handed the reactor a shell or exec channel
+# within CHANNEL_TIMEOUT is closed, so idle clients cannot pin a transport
+# thread (and a connection slot) forever.
+CHANNEL_TIMEOUT = float(os.getenv("SSH_CHANNEL_TIMEOUT", "30"))
+_awaiting = collections.deque()  # (deadline, transport), oldest first
+_handed_off = set()  # transports that have reached _handoff
+
+
+def _handoff(ch, exec_command):
+    _handed_off.add(ch.get_transport())
+    _PENDING.put((ch, exec_command))
+    try: _WAKE_W.send(b"\0")
+    except BlockingIOError: pass  # reactor already has a wake-up pending
+
+
+class _Session:
+    __slots__ = ("t", "ch", "buf")
+    def __init__(self, t, ch): self.t, self.ch, self.buf = t, ch, bytearray()
+    def close(self): self.hangup(); self.t.close()
+    def hangup(self):
+        # Close just the channel: the client disconnects once it sees that,
+        # and closing the socket under its reply would reset the connection.
+        try: _SEL.unregister(self.ch)
+        except (KeyError, ValueError): pass
+        try: self.ch.close()
+        except: pass
+
+
+def _process(sess):
+    data = sess.ch.recv(4096)
+    if not data: sess.close(); return
+    if sess.buf is None: return  # exec channel: nothing to do until the client closes
+    sess.buf.extend(data)
+    out = []  # replies for every complete line in this read, sent in one write
+    while (idx := sess.buf.find(b"\n")) != -1:
+        cmd = sess.buf[:idx].decode("utf-8", errors="ignore").strip().rstrip("\r")
+        del sess.buf[:idx + 1]
+        if not cmd: out.append(PROMPT_BYTES); continue
+        if cmd in ("exit", "quit", "logout"): out.append(b"\r\nBye!\r\n"); sess.ch.sendall(b"".join(out)); sess.close(); return
+        cmd_lower = cmd.lower()
+        frame = next((f for k, _, f in _PATTERNS if cmd_lower.startswith(k)), None)
+        if frame is None:
+          out.append(f"{cmd}\r\n% Invalid command: '{cmd}'\r\n{HOSTNAME}# \r\n".encode())
+        else:
+          out.append(cmd.encode()); out.append(frame)
+    if out: sess.ch.sendall(b"".join(out))
+
+
+def _start(ch, cmd):
+    t = ch.get_transport()
+    ch.settimeout(5)  # a reply to a stalled client must not wedge the reactor
+    if cmd is not None:
+        cmd_lower = cmd.lower()
+        resp = next((v for k, v, _ in _PATTERNS if cmd_lower.startswith(k)), None)
+        if resp is None: resp = f"% Invalid command: '{cmd}'\n".encode()
+        # paramiko only sends the exec request's CHANNEL_SUCCESS once the
+        # callback returns, so closing here could beat it to the client.
+        # Send EOF instead and tear down when the client closes its side,
+        # or after EXEC_LINGER for clients that wait for us.
+        ch.sendall(resp or b"\n")
+        ch.send_exit_status(0)
+        ch.shutdown_write()
+        sess = _Session(t, ch); sess.buf = None
+        _SEL.register(ch, selectors.EVENT_READ, sess)
+        _lingering.append((time.monotonic() + EXEC_LINGER, sess))
+        return
+    ch.sendall(PROMPT_BYTES)
+    _SEL.register(ch, selectors.EVENT_READ, _Session(t, ch))
+
+
+def _reactor():
+    while True:
+        for key, _ in _SEL.select(timeout=EXEC_LINGER if _lingering else 1):
+            if key.data is None:
+                try: _WAKE_R.recv(4096)
+                except BlockingIOError: pass
+                while True:
+                    try: ch, cmd = _PENDING.get_nowait()
+                    except queue.Empty: break
+                    try: _start(ch, cmd)
+                    except Exception:
+                        try: ch.close()
+                        except: pass
+                        ch.get_transport().close()
+                continue
+            try: _process(key.data)
+            except Exception: key.data.close()
+        now = time.monotonic()
+        while _lingering and _lingering[0][0] <= now:
+            sess = _lingering.popleft()[1]
+            if sess.ch.closed: sess.t.close()  # second expiry: drop a client that never left
+            else: sess.hangup(); _lingering.append((now + EXEC_LINGER, sess))
+        while _awaiting and _awaiting[0][0] <= now:
+            t = _awaiting.popleft()[1]
+            if t in _handed_off: _handed_off.discard(t)
+            else: t.close()
+
+
 def handle_client(sock, addr):
+    """Start SSH negotiation on paramiko's transport thread and return at
+    once; channels reach the reactor through MockSSH's request callbacks."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # small prompt/echo writes
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
     t = paramiko.Transport(sock)
     t.add_server_key(HOST_KEY)
-    server = MockSSH()
-    try:
-        t.start_server(server=server)
-    except paramiko.SSHException:
-        try: sock.close()
-        except Exception: pass
-        return
-    ch = t.accept(30)
-    if not ch: t.close(); return
-    server._ready.wait(timeout=5)
-    if server.exec_command is not None:
-        cmd = server.exec_command
-        resp = next((v for k, v in COMMAND_MAP.items() if cmd.lower().startswith(k.lower())), f"% Invalid command: '{cmd}'\n")
-        try:
-            ch.sendall(resp.encode() if resp else b"\n")
-            ch.send_exit_status(0)
-        except Exception:
-            pass
-        finally:
-            try: ch.close()
-            except: pass
-            t.close()
-        return
-    try:
-        ch.sendall(f"\r\n{HOSTNAME}# ".encode())
-        buf = b""
-        while True:
-            data = ch.recv(4096)
-            if not data: break
-            buf += data
-            while b"\n" in buf:
-                line, buf = buf.split(b"\n", 1)
-                cmd = line.decode("utf-8", errors="ignore").strip().rstrip("\r")
-                if not cmd: ch.sendall(f"\r\n{HOSTNAME}# ".encode()); continue
-                if cmd in ("exit", "quit", "logout"): ch.sendall(b"\r\nBye!\r\n"); return
-                resp = next((v for k, v in COMMAND_MAP.items() if cmd.lower().startswith(k.lower())), f"% Invalid command: '{cmd}'\r\n{HOSTNAME}# ")
-                if resp == "":
-                  ch.sendall(f"{cmd}\r\n{HOSTNAME}# ".encode())
-                else:
-                  ch.sendall(f"{cmd}\r\n{resp}\r\n".encode())
-    except Exception: pass
-    finally:
-        try: ch.close()
-        except: pass
-        t.close()
+    t.start_server(event=threading.Event(), server=MockSSH())
+    _awaiting.append((time.monotonic() + CHANNEL_TIMEOUT, t))
+    return t
 
 
 def main():
@@ -173,10 +264,15 @@ def main():
     print(f"[Mock NX-OS {HOSTNAME}] Listening on :{SSH_PORT}")
     signal.signal(signal.SIGTERM, lambda *_: (s.close(), sys.exit(0)))
     signal.signal(signal.SIGINT, lambda *_: (s.close(), sys.exit(0)))
+    threading.Thread(target=_reactor, daemon=True).start()
+    live = set()
     while True:
-        try:
-            c, a = s.accept()
-            threading.Thread(target=handle_client, args=(c, a), daemon=True).start()
+        try: c, a = s.accept()
         except OSError: break
+        live.difference_update([t for t in live if not t.is_active()])
+        if len(live) >= MAX_SSH_CONNS: c.close(); continue
+        # handle_client never blocks, so it runs inline on the acceptor.
+        try: live.add(handle_client(c, a))
+        except Exception: c.close()
 
 if __name__ == "__main__": main()
@@ -5,7 +5,10 @@ over SSH. This allows the deplyx CiscoConnector to connect and sync
 device facts, interfaces, VLANs, and IPs — exactly like a real switch.
 """
 
+import collections
 import os
+import queue
+import selectors
 import threading
 import time
 import signal
@@ -16,14 +19,34 @@ import sys
 import paramiko
 import socket
 
-HOST_KEY = paramiko.RSAKey.generate(2048)
+HOST_KEY_PATH = os.getenv("HOST_KEY_PATH", "/tmp/mock_ssh_host_rsa")
+
+
+def _load_or_generate_host_key(path=HOST_KEY_PATH):
+    """Reuse the host key from a previous start; generate and persist it once."""
+    try:
+        return paramiko.RSAKey(filename=path)
+    except (OSError, paramiko.SSHException):
+        key = paramiko.RSAKey.generate(2048)
+        try:
+            key.write_private_key_file(path)
+        except OSError:
+            pass
+        return key
+
+
+HOST_KEY = _load_or_generate_host_key()
 
 HOSTNAME = os.getenv("CISCO_HOSTNAME", "SW-DC1-CORE")
 SSH_PORT = int(os.getenv("SSH_PORT", "22"))
 SSH_USER = os.getenv("SSH_USER", "admin")
 SSH_PASS = os.getenv("SSH_PASS", "Cisco123!")
+# Each SSH connection holds one paramiko transport thread; past this many
+# live ones, new connections are refused rather than spawning more.
+MAX_SSH_CONNS = int(os.getenv("MAX_SSH_CONNS", "64"))
 
 # --- Mock command outputs ---
+# Each output is encoded once here and kept only as the bytes sent on the wire.
 
 SHOW_VERSION = f"""{HOSTNAME} uptime is 45 days, 12 hours, 33 minutes
 System returned to ROM by power-on
@@ -41,7 +64,7 @@ BOOTLDR: System Bootstrap, Version 17.9.4a
 Uptime for this control processor is 45 days, 12 hours, 35 minutes
 System returned to ROM by power-on
 
-{HOSTNAME}#"""
+{HOSTNAME}#""".encode()
 
 SHOW_INTERFACES = f"""GigabitEthernet0/0 is up, line protocol is up
   Hardware is iGbE, address is 0050.5600.0001 (bia 0050.5600.0001)
@@ -79,7 +102,7 @@ Vlan1 is up, line protocol is up
   Internet address is 10.0.99.1/24
   MTU 1500 bytes, BW 1000000 Kbit/sec, DLY 10 usec,
      reliability 255/255, txload 1/255, rxload 1/255
-{HOSTNAME}#"""
+{HOSTNAME}#""".encode()
 
 SHOW_VLAN = f"""VLAN Name                             Status    Ports
 ---- -------------------------------- --------- -------------------------------
@@ -100,7 +123,7 @@ VLAN Type  SAID       MTU   Parent RingNo BridgeNo Stp  BrdgMode Trans1 Trans2
 99   enet  100099     1500  -      -      -        -    -        0      0
 100  enet  100100     1500  -      -      -        -    -        0      0
 200  enet  100200     1500  -      -      -        -    -        0      0
-{HOSTNAME}#"""
+{HOSTNAME}#""".encode()
 
 SHOW_RUNNING = f"""Building configuration...
 
@@ -166,11 +189,9 @@ line vty 0 4
  transport input ssh
 !
 end
-{HOSTNAME}#"""
+{HOSTNAME}#""".encode()
 
 # NAPALM IOS "show vlan brief" — condensed single-table output.
-# Must be defined BEFORE "show vlan" so the startswith() lookup matches the
-# longer command first when NAPALM sends 'show vlan brief'.
 SHOW_VLAN_BRIEF = f"""VLAN Name                             Status    Ports
 ---- -------------------------------- --------- -------------------------------
 1    default                          active    Gi0/3
@@ -180,7 +201,7 @@ SHOW_VLAN_BRIEF = f"""VLAN Name                             Status    Ports
 99   NATIVE                           active
 100  DATABASE                         active
 200  BACKUP                           active
-{HOSTNAME}#"""
+{HOSTNAME}#""".encode()
 
 # NAPALM sends specific commands — we map them all
 COMMAND_MAP = {
@@ -195,14 +216,14 @@ GigabitEthernet0/1     10.0.10.1       YES NVRAM  up                    up
 GigabitEthernet0/2     10.0.20.1       YES NVRAM  up                    up
 GigabitEthernet0/3     unassigned      YES NVRAM  administratively down down
 Vlan1                  10.0.99.1       YES NVRAM  up                    up
-{HOSTNAME}#""",
+{HOSTNAME}#""".encode(),
     "show ip arp": f"""Protocol  Address          Age (min)  Hardware Addr   Type   Interface
 Internet  10.0.0.1             12   0050.5600.f001  ARPA   GigabitEthernet0/0
 Internet  10.0.0.2              -   0050.5600.0001  ARPA   GigabitEthernet0/0
 Internet  10.0.10.100           5   0050.5600.a001  ARPA   GigabitEthernet0/1
 Internet  10.0.10.101           3   0050.5600.a002  ARPA   GigabitEthernet0/1
 Internet  10.0.20.100           8   0050.5600.b001  ARPA   GigabitEthernet0/2
-{HOSTNAME}#""",
+{HOSTNAME}#""".encode(),
     "show mac address-table": f"""          Mac Address Table
 -------------------------------------------
 Vlan    Mac Address       Type        Ports
@@ -211,7 +232,7 @@ Vlan    Mac Address       Type        Ports
   10    0050.5600.a002    DYNAMIC     Gi0/1
   20    0050.5600.b001    DYNAMIC     Gi0/2
    1    0050.5600.f001    DYNAMIC     Gi0/0
-{HOSTNAME}#""",
+{HOSTNAME}#""".encode(),
     "show cdp neighbors": f"""Capability Codes: R - Router, T - Trans Bridge, B - Source Route Bridge
                   S - Switch, H - Host, I - IGMP, r - Repeater, P - Phone
 
@@ -219,17 +240,26 @@ Device ID        Local Intrfce     Holdtme    Capability  Platform  Port ID
 FW-DC1-01        Gi0/0             178              R S   PA-850    Eth1/1
 SW-DC1-ACC01     Gi0/1             145              S     WS-C2960  Gi0/1
 SW-DC1-ACC02     Gi0/2             145              S     WS-C2960  Gi0/1
-{HOSTNAME}#""",
-    "terminal length 0": "",
-    "terminal width 511": "",
+{HOSTNAME}#""".encode(),
+    "terminal length 0": b"",
+    "terminal width 511": b"",
 }
 
+PROMPT_BYTES = f"\r\n{HOSTNAME}#".encode()
+# (pattern, exec output, shell frame) with the longest pattern first, so
+# "show vlan brief" wins over "show vlan" whatever the order of COMMAND_MAP.
+# The shell frame is everything sent after the echoed command; setup commands
+# with no output just get the prompt back.
+_PATTERNS = sorted(
+    ((k.lower(), v, b"\r\n" + v + b"\r\n" if v else PROMPT_BYTES) for k, v in COMMAND_MAP.items()),
+    key=lambda p: -len(p[0]),
+)
+
 
 class MockSSHServer(paramiko.ServerInterface):
-    def __init__(self):
-        super().__init__()
-        self.exec_command = None
-        self._ready = threading.Event()
+    # Called on paramiko's transport thread: shell and exec requests hand
+    # their channel straight to the reactor, so no thread of ours waits in
+    # transport.accept() for the client to get around to opening one.
     def check_channel_request(self, kind, chanid):
         if kind == "session":
             return paramiko.OPEN_SUCCEEDED
@@ -246,11 +276,11 @@ class MockSSHServer(paramiko.ServerInterface):
         return True
 
     def check_channel_shell_request(self, channel):
+        _handoff(channel, None)
         return True
 
     def check_channel_exec_request(self, channel, command):
-        self.exec_command = command.decode("utf-8", errors="ignore").strip()
-        self._ready.set()
+        _handoff(channel, command.decode("utf-8", errors="ignore").strip())
         return True
 
     def get_allowed_auths(self, username):
@@ -260,90 +290,195 @@ class MockSSHServer(paramiko.ServerInterface):
         return paramiko.AUTH_SUCCESSFUL
 
 
-def handle_client(client_socket, address):
-    transport = paramiko.Transport(client_socket)
-    transport.add_server_key(HOST_KEY)
-    server = MockSSHServer()
-
+# ---------------------------------------------------------------------------
+# Every channel is served from one selector driven by a single reactor
+# thread, so concurrent NAPALM syncs no longer each tie up a worker of ours;
+# the only per-connection thread left is paramiko's own transport. New
+# channels are queued by _handoff and picked up when the wake socket turns
+# readable.
+_SEL = selectors.DefaultSelector()
+_PENDING = queue.SimpleQueue()
+_WAKE_R, _WAKE_W = socket.socketpair()
+_WAKE_R.setblocking(False)
+_WAKE_W.setblocking(False)
+_SEL.register(_WAKE_R, selectors.EVENT_READ)
+EXEC_LINGER = 0.25  # longest an answered exec channel waits for the client to close
+_lingering = collections.deque()  # (deadline, exec session), oldest first
+# A connection that has not handed the reactor a shell or exec channel
+# within CHANNEL_TIMEOUT is closed, so idle clients cannot pin a transport
+# thread (and a connection slot) forever.
+CHANNEL_TIMEOUT = float(os.getenv("SSH_CHANNEL_TIMEOUT", "30"))
+_awaiting = collections.deque()  # (deadline, transport), oldest first
+_handed_off = set()  # transports that have reached _handoff
+
+
+def _handoff(channel, exec_command):
+    _handed_off.add(channel.get_transport())
+    _PENDING.put((channel, exec_command))
     try:
-        transport.start_server(server=server)
-    except paramiko.SSHException:
-        client_socket.close()
-        return
+        _WAKE_W.send(b"\0")
+    except BlockingIOError:
+        pass  # the reactor already has a wake-up pending
 
-    channel = transport.accept(30)
-    if channel is None:
-        transport.close()
-        return
 
-    server._ready.wait(timeout=5)
-    if server.exec_command is not None:
-        cmd = server.exec_command
-        resp = next((v for k, v in COMMAND_MAP.items() if cmd.lower().startswith(k.lower())), f"% Invalid command: '{cmd}'\n")
+class _Session:
+    """Per-channel state owned by the reactor; ``buf`` is None for exec."""
+
+    __slots__ = ("transport", "channel", "address", "buf")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.transport = channel.get_transport()
+        self.address = self.transport.getpeername()
+        self.buf = bytearray()
+
+    def close(self):
+        self.hangup()
+        self.transport.close()
+
+    def hangup(self):
+        # Close just the channel: the client disconnects once it sees that,
+        # and closing the socket under its reply would reset the connection.
+        try:
+            _SEL.unregister(self.channel)
+        except (KeyError, ValueError):
+            pass
         try:
-            channel.sendall(resp.encode() if resp else b"\n")
-            channel.send_exit_status(0)
+            self.channel.close()
         except Exception:
             pass
-        finally:
-            try: channel.close()
-            except: pass
-            transport.close()
-        return
 
-    try:
+
+def _start(channel, exec_command):
+    session = _Session(channel)
+    channel.settimeout(5)  # a reply to a stalled client must not wedge the reactor
+    if exec_command is None:
         # Send initial prompt
-        channel.sendall(f"\r\n{HOSTNAME}#".encode())
+        channel.sendall(PROMPT_BYTES)
+        _SEL.register(channel, selectors.EVENT_READ, session)
+        return
 
-        buf = b""
-        while True:
+    cmd_lower = exec_command.lower()
+    resp = next((v for k, v, _ in _PATTERNS if cmd_lower.startswith(k)), None)
+    if resp is None:
+        resp = f"% Invalid command: '{exec_command}'\n".encode()
+    # paramiko only sends the exec request's CHANNEL_SUCCESS once the
+    # callback returns, so closing here could beat it to the client. Send
+    # EOF instead and tear down when the client closes its side, or after
+    # EXEC_LINGER for clients that wait for us.
+    channel.sendall(resp or b"\n")
+    channel.send_exit_status(0)
+    channel.shutdown_write()
+    session.buf = None
+    _SEL.register(channel, selectors.EVENT_READ, session)
+    _lingering.append((time.monotonic() + EXEC_LINGER, session))
+
+
+def _feed(session):
+    """Read from a readable channel and answer every complete line in it."""
+    data = session.channel.recv(4096)
+    if not data:
+        session.close()
+        return
+    if session.buf is None:
+        return  # exec channel: nothing to do until the client closes
+    session.buf.extend(data)
+
+    # Process complete lines, collecting the replies so that a
+    # pasted batch of commands goes out in a single write.
+    out = []
+    while (idx := session.buf.find(b"\n")) != -1:
+        cmd = session.buf[:idx].decode("utf-8", errors="ignore").strip().rstrip("\r")
+        del session.buf[:idx + 1]
+        if not cmd:
+            out.append(PROMPT_BYTES)
+            continue
+
+        if cmd in ("exit", "quit", "logout"):
+            out.append(b"\r\nBye!\r\n")
+            session.channel.sendall(b"".join(out))
+            session.close()
+            return
+
+        # Find matching command
+        cmd_lower = cmd.lower()
+        frame = next((f for k, _, f in _PATTERNS if cmd_lower.startswith(k)), None)
+
+        # Always echo the command first (PTY behaviour that netmiko's
+        # global_cmd_verify relies on), then the response.
+        if frame is None:
+            out.append(f"{cmd}\r\n% Unknown command: '{cmd}'\r\n{HOSTNAME}#\r\n".encode())
+        else:
+            out.append(cmd.encode())
+            out.append(frame)
+    if out:
+        session.channel.sendall(b"".join(out))
+
+
+def _drain_pending():
+    try:
+        _WAKE_R.recv(4096)
+    except BlockingIOError:
+        pass
+    while True:
+        try:
+            channel, exec_command = _PENDING.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            _start(channel, exec_command)
+        except Exception as e:
+            print(f"Error handling client {channel.get_transport().getpeername()}: {e}")
             try:
-                data = channel.recv(4096)
-                if not data:
-                    break
-                buf += data
-
-                # Process complete lines
-                while b"\n" in buf:
-                    line, buf = buf.split(b"\n", 1)
-                    cmd = line.decode("utf-8", errors="ignore").strip().rstrip("\r")
-                    if not cmd:
-                        channel.sendall(f"\r\n{HOSTNAME}#".encode())
-                        continue
-
-                    if cmd in ("exit", "quit", "logout"):
-                        channel.sendall(b"\r\nBye!\r\n")
-                        channel.close()
-                        return
-
-                    # Find matching command
-                    response = None
-                    for pattern, output in COMMAND_MAP.items():
-                        if cmd.lower().startswith(pattern.lower()):
-                            response = output
-                            break
-
-                    if response is None:
-                        response = f"% Unknown command: '{cmd}'\r\n{HOSTNAME}#"
-
-                    # Always echo the command first (PTY behaviour that netmiko's
-                    # global_cmd_verify relies on), then the response.
-                    # For setup commands (empty response) just send the prompt.
-                    if response == "":
-                        channel.sendall(f"{cmd}\r\n{HOSTNAME}#".encode())
-                    else:
-                        channel.sendall(f"{cmd}\r\n{response}\r\n".encode())
+                channel.close()
+            except Exception:
+                pass
+            channel.get_transport().close()
+
 
+def _reactor():
+    while True:
+        for key, _ in _SEL.select(timeout=EXEC_LINGER if _lingering else 1):
+            if key.data is None:
+                _drain_pending()
+                continue
+            session = key.data
+            try:
+                _feed(session)
             except (OSError, EOFError):
-                break
-    except Exception as e:
-        print(f"Error handling client {address}: {e}")
-    finally:
-        try:
-            channel.close()
-        except Exception:
-            pass
-        transport.close()
+                session.close()
+            except Exception as e:
+                print(f"Error handling client {session.address}: {e}")
+                session.close()
+        now = time.monotonic()
+        while _lingering and _lingering[0][0] <= now:
+            session = _lingering.popleft()[1]
+            if session.channel.closed:
+                session.transport.close()  # second expiry: drop a client that never left
+            else:
+                session.hangup()
+                _lingering.append((now + EXEC_LINGER, session))
+        while _awaiting and _awaiting[0][0] <= now:
+            transport = _awaiting.popleft()[1]
+            if transport in _handed_off:
+                _handed_off.discard(transport)
+            else:
+                transport.close()
+
+
+def handle_client(client_socket, address):
+    """Start SSH negotiation on paramiko's transport thread and return at once.
+
+    Channels reach the reactor through MockSSHServer's request callbacks.
+    """
+    # Prompt, echo and output are small writes; don't let Nagle hold them back.
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    transport = paramiko.Transport(client_socket)
+    transport.add_server_key(HOST_KEY)
+    transport.start_server(event=threading.Event(), server=MockSSHServer())
+    _awaiting.append((time.monotonic() + CHANNEL_TIMEOUT, transport))
+    return transport
 
 
 def main():
@@ -361,15 +496,25 @@ def main():
     signal.signal(signal.SIGINT, shutdown)
     signal.signal(signal.SIGTERM, shutdown)
 
+    threading.Thread(target=_reactor, daemon=True).start()
+
+    live = set()
     while True:
         try:
             client_socket, address = sock.accept()
-            print(f"[Mock Cisco {HOSTNAME}] Connection from {address}")
-            t = threading.Thread(target=handle_client, args=(client_socket, address))
-            t.daemon = True
-            t.start()
         except OSError:
             break
+        live.difference_update([t for t in live if not t.is_active()])
+        if len(live) >= MAX_SSH_CONNS:
+            print(f"[Mock Cisco {HOSTNAME}] Refusing {address}: {MAX_SSH_CONNS} connections open")
+            client_socket.close()
+            continue
+        print(f"[Mock Cisco {HOSTNAME}] Connection from {address}")
+        # handle_client never blocks, so it runs inline on the acceptor.
+        try:
+            live.add(handle_client(client_socket, address))
+        except Exception:
+            client_socket.close()
 
 
 if __name__ == "__main__":
@@ -7,44 +7,88 @@ Simulates the FortiOS REST API endpoints used by the deplyx FortinetConnector:
   - PUT /api/v2/cmdb/firewall/policy/:id → update policy
 """
 
+# gevent must patch the stdlib before anything else imports socket/ssl.
+from gevent import monkey
+
+monkey.patch_all()
+
+import hmac
 import os
-from flask import Flask, jsonify, request
+import ssl
+
+import orjson
+from flask import Flask, Response, request
+from gevent.pywsgi import WSGIServer
+from werkzeug.serving import make_ssl_devcert
 
 app = Flask(__name__)
 
+
+def _json(data, status=200):
+    """Serialize with orjson instead of going through jsonify."""
+    return Response(orjson.dumps(data), status=status, mimetype="application/json")
+
 API_TOKEN = os.getenv("FORTINET_API_TOKEN", "fg-lab-token-001")
 HOSTNAME = os.getenv("FORTINET_HOSTNAME", "FG-DC1-01")
 SERIAL = os.getenv("FORTINET_SERIAL", "FGT60F0000000001")
+API_PORT = int(os.getenv("API_PORT", "443"))
+TLS_CERT_BASE = os.getenv("TLS_CERT_BASE", "/tmp/fortinet-mock")
+
+
+_EXPECTED_AUTH = f"Bearer {API_TOKEN}".encode()
+
+
+_UNAUTH_BYTES = orjson.dumps({"error": "Unauthorized"})
+_UNAUTH_HEADERS = [
+    ("Content-Type", "application/json"),
+    ("Content-Length", str(len(_UNAUTH_BYTES))),
+]
 
 
-def _check_auth():
-    auth = request.headers.get("Authorization", "")
-    if auth != f"Bearer {API_TOKEN}":
-        return jsonify({"error": "Unauthorized"}), 401
-    return None
+class _AuthMiddleware:
+    """Reject bad tokens straight from the WSGI environ.
+
+    Every endpoint needs the same bearer token, so checking it here spares
+    Flask building a Request just to answer 401.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        auth = environ.get("HTTP_AUTHORIZATION", "").encode("latin-1")
+        if not hmac.compare_digest(auth, _EXPECTED_AUTH):
+            start_response("401 UNAUTHORIZED", _UNAUTH_HEADERS)
+            return [_UNAUTH_BYTES]
+        return self.wsgi_app(environ, start_response)
+
+
+app.wsgi_app = _AuthMiddleware(app.wsgi_app)
 
 
 # ---------- System status ----------
+# The GET payloads never change (policies only on PUT), so their bodies are
+# serialized once instead of on every request.
+_SYSTEM_STATUS_BYTES = orjson.dumps({
+    "http_method": "GET",
+    "results": {
+        "hostname": HOSTNAME,
+        "serial": SERIAL,
+        "version": "v7.4.3",
+        "build": "2573",
+        "model_name": "FortiGate-60F",
+        "model_number": "FGT60F",
+        "log_disk_usage": 12,
+        "current_time": "2026-02-18 10:00:00",
+    },
+    "vdom": "root",
+    "status": "success",
+})
+
+
 @app.route("/api/v2/monitor/system/status", methods=["GET"])
 def system_status():
-    err = _check_auth()
-    if err:
-        return err
-    return jsonify({
-        "http_method": "GET",
-        "results": {
-            "hostname": HOSTNAME,
-            "serial": SERIAL,
-            "version": "v7.4.3",
-            "build": "2573",
-            "model_name": "FortiGate-60F",
-            "model_number": "FGT60F",
-            "log_disk_usage": 12,
-            "current_time": "2026-02-18 10:00:00",
-        },
-        "vdom": "root",
-        "status": "success",
-    })
+    return Response(_SYSTEM_STATUS_BYTES, mimetype="application/json")
 
 
 # ---------- Interfaces ----------
@@ -102,17 +146,17 @@ INTERFACES = [
 ]
 
 
+_INTERFACES_BYTES = orjson.dumps({
+    "http_method": "GET",
+    "results": INTERFACES,
+    "vdom": "root",
+    "status": "success",
+})
+
+
 @app.route("/api/v2/cmdb/system/interface", methods=["GET"])
 def interfaces():
-    err = _check_auth()
-    if err:
-        return err
-    return jsonify({
-        "http_method": "GET",
-        "results": INTERFACES,
-        "vdom": "root",
-        "status": "success",
-    })
+    return Response(_INTERFACES_BYTES, mimetype="application/json")
 
 
 # ---------- Firewall policies ----------
@@ -185,12 +229,19 @@ POLICIES = [
 ]
 
 
-@app.route("/api/v2/cmdb/firewall/policy", methods=["GET"])
-def firewall_policies():
-    err = _check_auth()
-    if err:
-        return err
-    return jsonify({
+def _index_policies():
+    index: dict[int, dict] = {}
+    for p in POLICIES:
+        index.setdefault(p["policyid"], p)  # first match wins, as with a scan
+    return index
+
+
+# policyid → policy, so the per-policy endpoints do a hash lookup, not a scan.
+_policy_index = _index_policies()
+
+
+def _dump_policies():
+    return orjson.dumps({
         "http_method": "GET",
         "results": POLICIES,
         "vdom": "root",
@@ -198,15 +249,21 @@ def firewall_policies():
     })
 
 
+# Rebuilt whenever a PUT changes a policy.
+_POLICIES_BYTES = _dump_policies()
+
+
+@app.route("/api/v2/cmdb/firewall/policy", methods=["GET"])
+def firewall_policies():
+    return Response(_POLICIES_BYTES, mimetype="application/json")
+
+
 @app.route("/api/v2/cmdb/firewall/policy/<int:policy_id>", methods=["GET"])
 def firewall_policy_detail(policy_id):
-    err = _check_auth()
-    if err:
-        return err
-    pol = next((p for p in POLICIES if p["policyid"] == policy_id), None)
+    pol = _policy_index.get(policy_id)
     if pol is None:
-        return jsonify({"http_method": "GET", "status": "error", "error": "Policy not found"}), 404
-    return jsonify({
+        return _json({"http_method": "GET", "status": "error", "error": "Policy not found"}, 404)
+    return _json({
         "http_method": "GET",
         "results": [pol],
         "vdom": "root",
@@ -216,15 +273,21 @@ def firewall_policy_detail(policy_id):
 
 @app.route("/api/v2/cmdb/firewall/policy/<int:policy_id>", methods=["PUT"])
 def update_firewall_policy(policy_id):
-    err = _check_auth()
-    if err:
-        return err
-    pol = next((p for p in POLICIES if p["policyid"] == policy_id), None)
+    global _POLICIES_BYTES, _policy_index
+    pol = _policy_index.get(policy_id)
     if pol is None:
-        return jsonify({"status": "error", "error": "Policy not found"}), 404
-    data = request.json or {}
+        return _json({"status": "error", "error": "Policy not found"}, 404)
+    try:
+        data = orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        data = None
+    if not isinstance(data, dict):
+        return _json({"http_method": "PUT", "status": "error", "http_status": 400, "error": "Invalid JSON body"}, 400)
     pol.update(data)
-    return jsonify({
+    if "policyid" in data:
+        _policy_index = _index_policies()
+    _POLICIES_BYTES = _dump_policies()
+    return _json({
         "http_method": "PUT",
         "results": {"mkey": str(policy_id)},
         "vdom": "root",
@@ -233,4 +296,16 @@ def update_firewall_policy(policy_id):
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=443, ssl_context="adhoc")
+    # gevent serves requests concurrently on greenlets, where the Werkzeug
+    # dev server handled them one at a time. The self-signed cert is created
+    # once and reused, rather than regenerated on every start by "adhoc".
+    cert_file, key_file = f"{TLS_CERT_BASE}.crt", f"{TLS_CERT_BASE}.key"
+    if not (os.path.exists(cert_file) and os.path.exists(key_file)):
+        cert_file, key_file = make_ssl_devcert(TLS_CERT_BASE, host=HOSTNAME)
+    # TLS 1.2+ with AEAD ECDHE suites only; AES-GCM is the cheapest cipher on
+    # AES-NI hardware and TLS 1.3 resumes without a full handshake.
+    ssl_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ssl_ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+    ssl_ctx.set_ciphers("ECDHE+AESGCM:ECDHE+CHACHA20")
+    ssl_ctx.load_cert_chain(cert_file, key_file)
+    WSGIServer(("0.0.0.0", API_PORT), app, backlog=1024, ssl_context=ssl_ctx).serve_forever()
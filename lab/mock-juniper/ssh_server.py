@@ -13,22 +13,70 @@ over SSH (subsystem "netconf"). This server:
 All non-NETCONF connections are rejected; this is a NETCONF-only device.
 """
 
+import collections
+import hmac
+import logging
 import os
+import queue
+import selectors
 import threading
 import signal
 import sys
 import socket
 import re
+import time
 
 import paramiko
 
-HOST_KEY = paramiko.RSAKey.generate(2048)
+log = logging.getLogger("mock-juniper")
+
+HOST_KEY_PATH = os.getenv("HOST_KEY_PATH", "/tmp/mock_ssh_host_rsa")
+
+
+def _load_or_generate_host_key(path: str = HOST_KEY_PATH) -> paramiko.RSAKey:
+    """Load the host key from disk, generating and saving it on first start.
+
+    Generating a 2048-bit RSA key costs seconds of CPU, so it is done once per
+    container rather than on every restart.
+    """
+    try:
+        return paramiko.RSAKey(filename=path)
+    except (OSError, paramiko.SSHException):
+        key = paramiko.RSAKey.generate(2048)
+        try:
+            key.write_private_key_file(path)
+        except OSError:
+            pass
+        return key
+
+
+HOST_KEY = _load_or_generate_host_key()
 
 HOSTNAME = os.getenv("JUNIPER_HOSTNAME", "SW-DC2-CORE")
 SERIAL   = os.getenv("JUNIPER_SERIAL",   "JN1234567890")
 SSH_PORT = int(os.getenv("SSH_PORT", "22"))
 SSH_USER = os.getenv("SSH_USER", "admin")
 SSH_PASS = os.getenv("SSH_PASS", "Juniper123!")
+# MOCK_NETCONF_PLAINTEXT=1 also serves NETCONF straight over TCP on
+# NETCONF_PLAIN_PORT, skipping SSH key exchange and auth. In-cluster test
+# harnesses can use it to load the RPC path without paying for paramiko.
+NETCONF_PLAINTEXT = os.getenv("MOCK_NETCONF_PLAINTEXT", "") == "1"
+NETCONF_PLAIN_PORT = int(os.getenv("NETCONF_PLAIN_PORT", "8830"))
+
+# Only offer algorithms that are cheap to negotiate and run: curve25519/ECDH
+# key exchange instead of the big-integer DH groups, AES done in C by
+# cryptography, SHA-2 MACs. PyEZ/ncclient (paramiko) all speak these.
+SSH_KEX = ("curve25519-sha256@libssh.org", "ecdh-sha2-nistp256")
+SSH_CIPHERS = ("aes128-ctr", "aes256-ctr", "aes128-gcm@openssh.com", "aes256-gcm@openssh.com")
+SSH_DIGESTS = ("hmac-sha2-256", "hmac-sha2-512", "hmac-sha2-256-etm@openssh.com", "hmac-sha2-512-etm@openssh.com")
+# Credentials are compared as bytes in constant time.
+_SSH_USER_B = SSH_USER.encode()
+_SSH_PASS_B = SSH_PASS.encode()
+# Each SSH connection holds one paramiko transport thread; past this many
+# live ones, new connections are refused rather than spawning more.
+MAX_SSH_CONNS = int(os.getenv("MAX_SSH_CONNS", "64"))
+# Per-connection messages are logged at INFO, so they are off unless asked for.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "WARNING").upper()
 
 # ---------------------------------------------------------------------------
 # NETCONF framing helpers
@@ -41,18 +89,26 @@ def _frame(xml: str) -> bytes:
     return xml.encode() + b"\n" + EOM + b"\n"
 
 
-def _rpc_reply(message_id: str, inner_xml: str) -> bytes:
-    return _frame(
-        f'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"'
-        f' xmlns:junos="http://xml.juniper.net/junos/22.4R0/junos"'
-        f' message-id="{message_id}">'
-        f"{inner_xml}"
-        f"</rpc-reply>"
-    )
+# An <rpc-reply> is split around its message-id: everything before it is
+# shared, and everything after it depends only on the reply body.
+_REPLY_HEAD = (
+    b'<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0"'
+    b' xmlns:junos="http://xml.juniper.net/junos/22.4R0/junos"'
+    b' message-id="'
+)
+
+
+def _reply_tail(inner_xml: str) -> bytes:
+    return _frame(f'">{inner_xml}</rpc-reply>')
+
+
+def _cached_reply(message_id: str, tail: bytes) -> bytes:
+    """Build a reply from a tail framed ahead of time by _reply_tail."""
+    return _REPLY_HEAD + message_id.encode() + tail
 
 
 def _ok_reply(message_id: str) -> bytes:
-    return _rpc_reply(message_id, "<ok/>")
+    return _cached_reply(message_id, _OK_TAIL)
 
 
 # ---------------------------------------------------------------------------
@@ -198,23 +254,78 @@ _RUNNING_CONFIG = f"""<configuration>
   </routing-options>
 </configuration>"""
 
-# Candidate config (mutable per-session — we keep it global for simplicity)
-_candidate_config: dict = {}
+# The reply bodies only depend on HOSTNAME/SERIAL, so each one is framed once
+# at import rather than rebuilt and encoded on every RPC.
+_OK_TAIL = _reply_tail("<ok/>")
+_SOFTWARE_TAIL = _reply_tail(_software_info_xml())
+_CHASSIS_TAIL = _reply_tail(_chassis_info_xml())
+_SYSTEM_TAIL = _reply_tail(_system_info_xml())
+_INTERFACES_TAIL = _reply_tail(_interfaces_xml())
+_VLAN_TAIL = _reply_tail(_vlan_xml())
+_CONFIG_DATA_TAIL = _reply_tail(f"<data>{_RUNNING_CONFIG}</data>")
+_MACDB_TAIL = _reply_tail(
+    "<l2ng-l2ald-rtb-macdb><l2ng-mac-entry-count>0</l2ng-mac-entry-count></l2ng-l2ald-rtb-macdb>"
+)
+_SHOW_VERSION_ERROR_TAIL = _reply_tail(
+    "<rpc-error>"
+    "<error-type>application</error-type>"
+    "<error-tag>unknown-element</error-tag>"
+    "<error-severity>error</error-severity>"
+    "<error-message>CLI command not supported in NETCONF context</error-message>"
+    "</rpc-error>"
+)
+_EMPTY_OUTPUT_TAIL = _reply_tail("<output></output>")
+
+_SERVER_HELLO = _frame(
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<hello xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">'
+    "<capabilities>"
+    "<capability>urn:ietf:params:xml:ns:netconf:base:1.0</capability>"
+    "<capability>urn:ietf:params:xml:ns:netconf:capability:writable-running:1.0</capability>"
+    "<capability>urn:ietf:params:xml:ns:netconf:capability:candidate:1.0</capability>"
+    "<capability>urn:ietf:params:xml:ns:netconf:capability:confirmed-commit:1.0</capability>"
+    "<capability>urn:ietf:params:xml:ns:netconf:capability:rollback-on-error:1.0</capability>"
+    "<capability>urn:ietf:params:xml:ns:netconf:capability:validate:1.0</capability>"
+    "<capability>urn:ietf:params:xml:ns:netconf:capability:url:1.0</capability>"
+    "<capability>http://xml.juniper.net/netconf/junos/1.0</capability>"
+    "</capabilities><session-id>1</session-id>"
+    "</hello>"
+)
+
+# Candidate config is kept per session; edit-config XML past this many
+# characters is rejected with a too-big rpc-error and leaves the candidate
+# untouched, so a chatty client cannot grow it without bound.
+CANDIDATE_MAX = 65536
+_TOO_BIG_TAIL = _reply_tail(
+    "<rpc-error>"
+    "<error-type>application</error-type>"
+    "<error-tag>too-big</error-tag>"
+    "<error-severity>error</error-severity>"
+    f"<error-message>configuration exceeds {CANDIDATE_MAX} characters</error-message>"
+    "</rpc-error>"
+)
 
 
 # ---------------------------------------------------------------------------
 # NETCONF session handler
 # ---------------------------------------------------------------------------
 
+_MESSAGE_ID_RE = re.compile(r'message-id=["\']([^"\']+)["\']', re.ASCII)
+_COMMAND_RE = re.compile(r"<command[^>]*>(.*?)</command>", re.IGNORECASE | re.DOTALL | re.ASCII)
+
+
 def _extract_message_id(xml: str) -> str:
-    m = re.search(r'message-id=["\']([^"\']+)["\']', xml)
+    m = _MESSAGE_ID_RE.search(xml)
     return m.group(1) if m else "1"
 
 
-def _handle_rpc(xml: str) -> bytes:
-    """Dispatch a single RPC request and return the framed reply bytes."""
+def _handle_rpc(xml: str, xml_lower: str, candidate: dict) -> bytes:
+    """Dispatch a single RPC request and return the framed reply bytes.
+
+    ``xml_lower`` is ``xml.lower()``, already computed by the caller.
+    ``candidate`` is the calling session's candidate config.
+    """
     message_id = _extract_message_id(xml)
-    xml_lower = xml.lower()
 
     # close-session / lock / unlock — always OK
     if "<close-session" in xml_lower or "<lock" in xml_lower or "<unlock" in xml_lower:
@@ -222,139 +333,259 @@ def _handle_rpc(xml: str) -> bytes:
 
     # discard-changes
     if "<discard-changes" in xml_lower:
-        _candidate_config.clear()
+        candidate.clear()
         return _ok_reply(message_id)
 
     # commit
     if "<commit" in xml_lower:
-        _candidate_config.clear()
+        candidate.clear()
         return _ok_reply(message_id)
 
-    # edit-config — accept anything, store candidate
+    # edit-config — accept anything that fits, store candidate
     if "<edit-config" in xml_lower:
-        _candidate_config["pending"] = xml
+        if len(xml) > CANDIDATE_MAX:
+            return _cached_reply(message_id, _TOO_BIG_TAIL)
+        candidate["pending"] = xml
         return _ok_reply(message_id)
 
     # get-config — return running or candidate
     if "<get-config" in xml_lower:
-        inner = f"<data>{_RUNNING_CONFIG}</data>"
-        return _rpc_reply(message_id, inner)
+        return _cached_reply(message_id, _CONFIG_DATA_TAIL)
 
     # get-software-information
     if "get-software-information" in xml_lower:
-        return _rpc_reply(message_id, _software_info_xml())
+        return _cached_reply(message_id, _SOFTWARE_TAIL)
 
     # get-chassis-information / get-chassis-inventory
     if "get-chassis-information" in xml_lower or "get-chassis-inventory" in xml_lower:
-        return _rpc_reply(message_id, _chassis_info_xml())
+        return _cached_reply(message_id, _CHASSIS_TAIL)
 
     # get-system-information (used by some PyEZ versions)
     if "get-system-information" in xml_lower:
-        return _rpc_reply(message_id, _system_info_xml())
+        return _cached_reply(message_id, _SYSTEM_TAIL)
 
     # get-interface-information  (NAPALM get_interfaces / get_interfaces_ip)
     if "get-interface-information" in xml_lower:
-        return _rpc_reply(message_id, _interfaces_xml())
+        return _cached_reply(message_id, _INTERFACES_TAIL)
 
     # get-vlan-information / l2ald VLAN table (NAPALM get_vlans)
     if ("get-vlan-information" in xml_lower
             or "get-l2ng-l2ald-vlan" in xml_lower
             or "get-l2ng-l2rtb-mac-ip-table" in xml_lower):
-        return _rpc_reply(message_id, _vlan_xml())
+        return _cached_reply(message_id, _VLAN_TAIL)
 
     # Ethernet switching table — PyEZ ethernet_mac_table.py checks the response tag
     # to determine switch_style.  Return l2ng-l2ald-rtb-macdb so it resolves to VLAN_L2NG.
     if "get-ethernet-switching-table-information" in xml_lower:
-        return _rpc_reply(
-            message_id,
-            "<l2ng-l2ald-rtb-macdb><l2ng-mac-entry-count>0</l2ng-mac-entry-count></l2ng-l2ald-rtb-macdb>",
-        )
+        return _cached_reply(message_id, _MACDB_TAIL)
 
     # <command> RPCs (e.g. "show bridge mac-table count")
     if "<command>" in xml_lower:
         # Extract the actual CLI command text
-        cmd_m = re.search(r"<command[^>]*>(.*?)</command>", xml, re.IGNORECASE | re.DOTALL)
+        cmd_m = _COMMAND_RE.search(xml)
         cmd_text = (cmd_m.group(1).strip().lower() if cmd_m else "")
 
         if "show version" in cmd_text:
             # _get_swver() in NAPALM tries cli("show version ...") first and falls
             # back to get-software-information on exception.  Return an error here
             # so the except-clause triggers and we get called via the proper RPC.
-            return _rpc_reply(
-                message_id,
-                "<rpc-error>"
-                "<error-type>application</error-type>"
-                "<error-tag>unknown-element</error-tag>"
-                "<error-severity>error</error-severity>"
-                "<error-message>CLI command not supported in NETCONF context</error-message>"
-                "</rpc-error>",
-            )
+            return _cached_reply(message_id, _SHOW_VERSION_ERROR_TAIL)
 
         # All other <command> RPCs (bridge mac-table, etc.) — return empty output
-        return _rpc_reply(message_id, "<output></output>")
+        return _cached_reply(message_id, _EMPTY_OUTPUT_TAIL)
 
     # Generic <get> with filter — return running config data
     if "<get" in xml_lower:
-        inner = f"<data>{_RUNNING_CONFIG}</data>"
-        return _rpc_reply(message_id, inner)
+        return _cached_reply(message_id, _CONFIG_DATA_TAIL)
 
     # Unknown RPC — return <ok/> so callers treat it as a no-op instead of raising.
     # (Real Junos returns <ok/> for RPCs it doesn't support in the current context.)
     return _ok_reply(message_id)
 
 
-def handle_netconf_session(channel: paramiko.Channel) -> None:
-    """Run a full NETCONF 1.0 session on the given paramiko channel."""
-
-    # Send our <hello> first
-    server_hello = _frame(
-        '<?xml version="1.0" encoding="UTF-8"?>'
-        '<hello xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">'
-        "<capabilities>"
-        "<capability>urn:ietf:params:xml:ns:netconf:base:1.0</capability>"
-        "<capability>urn:ietf:params:xml:ns:netconf:capability:writable-running:1.0</capability>"
-        "<capability>urn:ietf:params:xml:ns:netconf:capability:candidate:1.0</capability>"
-        "<capability>urn:ietf:params:xml:ns:netconf:capability:confirmed-commit:1.0</capability>"
-        "<capability>urn:ietf:params:xml:ns:netconf:capability:rollback-on-error:1.0</capability>"
-        "<capability>urn:ietf:params:xml:ns:netconf:capability:validate:1.0</capability>"
-        "<capability>urn:ietf:params:xml:ns:netconf:capability:url:1.0</capability>"
-        "<capability>http://xml.juniper.net/netconf/junos/1.0</capability>"
-        f"</capabilities><session-id>1</session-id>"
-        "</hello>"
-    )
-    channel.sendall(server_hello)
-
-    buf = b""
+# ---------------------------------------------------------------------------
+# Reactor — one thread serves every NETCONF channel
+# ---------------------------------------------------------------------------
+# paramiko still runs each transport on a thread of its own, but no thread of
+# ours blocks per session: the netconf subsystem request queues its channel
+# for the reactor and wakes it through a socketpair, and the reactor then
+# answers RPCs on whichever channels are readable. Plaintext connections are
+# queued the same way; a socket has the recv/sendall/fileno a channel does.
+_SEL = selectors.DefaultSelector()
+_PENDING: queue.SimpleQueue = queue.SimpleQueue()
+_WAKE_R, _WAKE_W = socket.socketpair()
+_WAKE_R.setblocking(False)
+_WAKE_W.setblocking(False)
+_SEL.register(_WAKE_R, selectors.EVENT_READ)
+# An SSH connection that has not asked for the netconf subsystem within
+# CHANNEL_TIMEOUT is closed, so idle clients cannot pin a transport thread
+# (and a connection slot) forever.
+CHANNEL_TIMEOUT = float(os.getenv("SSH_CHANNEL_TIMEOUT", "30"))
+_awaiting: collections.deque = collections.deque()  # (deadline, transport), oldest first
+_handed_off: set = set()  # transports whose netconf channel reached _handoff
+# sendmsg takes at most this many buffers per call.
+_IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+
+
+def _handoff(channel) -> None:
+    _PENDING.put(channel)
+    try:
+        _WAKE_W.send(b"\0")
+    except BlockingIOError:
+        pass  # the reactor already has a wake-up pending
+
+
+class _NetconfSession:
+    """Per-channel NETCONF state owned by the reactor.
+
+    ``channel`` is a paramiko channel, or the client socket itself for a
+    plaintext session, in which case there is no transport to close.
+    """
+
+    __slots__ = ("channel", "transport", "address", "buf", "candidate")
+
+    def __init__(self, channel) -> None:
+        self.channel = channel
+        if isinstance(channel, socket.socket):
+            self.transport = None
+            self.address = channel.getpeername()
+        else:
+            self.transport = channel.get_transport()
+            self.address = self.transport.getpeername()
+        self.buf = bytearray()
+        self.candidate: dict = {}
+
+    def close(self) -> None:
+        try:
+            _SEL.unregister(self.channel)
+        except (KeyError, ValueError):
+            pass
+        try:
+            self.channel.close()
+        except Exception:
+            pass
+        if self.transport is not None:
+            self.transport.close()
+
+
+def _start_session(session: _NetconfSession) -> None:
+    """Send our <hello> and start watching the channel for RPCs."""
+    channel = session.channel
+    channel.settimeout(5)  # a reply to a stalled client must not wedge the reactor
+    channel.sendall(_SERVER_HELLO)
+    _SEL.register(channel, selectors.EVENT_READ, session)
+
+
+def _send_replies(session: _NetconfSession, parts: list[bytes]) -> None:
+    """Write a batch of replies without concatenating them where possible.
+
+    A plaintext session scatter-writes the parts straight from the cached
+    reply bytes with ``sendmsg``. An SSH channel has to go through paramiko's
+    packetizer, which copies anyway, so the parts are joined once.
+    """
+    if session.transport is not None:
+        session.channel.sendall(b"".join(parts))
+        return
+    views = [memoryview(p) for p in parts]
+    while views:
+        sent = session.channel.sendmsg(views[:_IOV_MAX])
+        while views and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent:
+            views[0] = views[0][sent:]
+
+
+def _feed(session: _NetconfSession) -> None:
+    """Read from a readable channel and answer every complete RPC in it."""
+    chunk = session.channel.recv(8192)
+    if not chunk:
+        session.close()
+        return
+    # Grow the buffer in place and cut each ]]>]]>-terminated message off the
+    # front, instead of copying the remainder on every recv and split.
+    session.buf += chunk
+    # Replies to every RPC in this recv go out in one write, so pipelined
+    # RPCs do not each cost a separate small segment.
+    out: list[bytes] = []
+    while (idx := session.buf.find(EOM)) >= 0:
+        msg_bytes = bytes(session.buf[:idx])
+        del session.buf[:idx + len(EOM)]
+        # Decoding stays: CPython's bytes ``in`` test is several times slower
+        # than str's, which would cost more in _handle_rpc's keyword cascade
+        # than the decode saves. Whitespace around the message does not change
+        # any match, so it is only checked for, not stripped off.
+        msg = msg_bytes.decode("utf-8", errors="replace")
+        if not msg or msg.isspace():
+            continue
+
+        # Lowered once and shared with _handle_rpc's keyword tests.
+        msg_lower = msg.lower()
+
+        # Skip the client hello — no reply needed.
+        # ncclient may send <hello> or <nc:hello> (with namespace prefix),
+        # so we detect by the presence of <capabilities> which only appears
+        # in hello messages, never in RPCs.
+        if "<capabilities" in msg_lower or "hello" in msg_lower:
+            continue
+
+        out.append(_handle_rpc(msg, msg_lower, session.candidate))
+
+        # Close after <close-session>
+        if "<close-session" in msg_lower:
+            _send_replies(session, out)
+            session.close()
+            return
+    if out:
+        _send_replies(session, out)
+
+
+def _drain_pending() -> None:
+    try:
+        _WAKE_R.recv(4096)
+    except BlockingIOError:
+        pass
     while True:
         try:
-            chunk = channel.recv(8192)
-            if not chunk:
-                break
-            buf += chunk
-
-            # Split on ]]>]]> end-of-message marker
-            while EOM in buf:
-                msg_bytes, buf = buf.split(EOM, 1)
-                msg = msg_bytes.decode("utf-8", errors="replace").strip()
-                if not msg:
-                    continue
-
-                # Skip the client hello — no reply needed.
-                # ncclient may send <hello> or <nc:hello> (with namespace prefix),
-                # so we detect by the presence of <capabilities> which only appears
-                # in hello messages, never in RPCs.
-                if "<capabilities" in msg.lower() or "hello" in msg.lower():
-                    continue
-
-                reply = _handle_rpc(msg)
-                channel.sendall(reply)
-
-                # Close after <close-session>
-                if "<close-session" in msg.lower():
-                    return
-
-        except (OSError, EOFError):
-            break
+            channel = _PENDING.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            session = _NetconfSession(channel)
+        except OSError:
+            channel.close()  # the client is already gone
+            continue
+        try:
+            _start_session(session)
+        except Exception as exc:
+            log.warning("[Juniper] Session error from %s: %s", session.address, exc)
+            session.close()
+
+
+def _expire_idle_transports() -> None:
+    now = time.monotonic()
+    while _awaiting and _awaiting[0][0] <= now:
+        transport = _awaiting.popleft()[1]
+        if transport in _handed_off:
+            _handed_off.discard(transport)
+        else:
+            transport.close()
+
+
+def _reactor() -> None:
+    while True:
+        for key, _ in _SEL.select(timeout=1):
+            if key.data is None:
+                _drain_pending()
+                continue
+            session = key.data
+            try:
+                _feed(session)
+            except (OSError, EOFError):
+                session.close()
+            except Exception as exc:
+                log.warning("[Juniper] Session error from %s: %s", session.address, exc)
+                session.close()
+        _expire_idle_transports()
 
 
 # ---------------------------------------------------------------------------
@@ -366,7 +597,9 @@ class _NetconfSSHServer(paramiko.ServerInterface):
         return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
 
     def check_auth_password(self, username, password):
-        return paramiko.AUTH_SUCCESSFUL if username == SSH_USER and password == SSH_PASS else paramiko.AUTH_FAILED
+        if hmac.compare_digest(username.encode(), _SSH_USER_B) and hmac.compare_digest(password.encode(), _SSH_PASS_B):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
 
     def check_auth_publickey(self, username, key):
         # Accept any key — authentication via password is sufficient for the lab
@@ -376,8 +609,13 @@ class _NetconfSSHServer(paramiko.ServerInterface):
         return "password,publickey"
 
     def check_channel_subsystem_request(self, channel, name):
-        # NAPALM junos uses "netconf" subsystem
-        return name == "netconf"
+        # NAPALM junos uses "netconf" subsystem. Runs on paramiko's transport
+        # thread, so the channel is handed to the reactor rather than served here.
+        if name != "netconf":
+            return False
+        _handed_off.add(channel.get_transport())
+        _handoff(channel)
+        return True
 
     def check_channel_shell_request(self, channel):
         # Reject plain shell — this is NETCONF-only
@@ -387,41 +625,49 @@ class _NetconfSSHServer(paramiko.ServerInterface):
         return False
 
 
-def _handle_connection(client_socket: socket.socket, address) -> None:
+def _handle_connection(client_socket: socket.socket, address) -> paramiko.Transport:
+    """Start SSH negotiation on paramiko's transport thread and return at once.
+
+    The session itself begins when the client requests the netconf subsystem.
+    """
+    # NETCONF replies are small writes; don't let Nagle hold them back.
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     transport = paramiko.Transport(client_socket)
     transport.add_server_key(HOST_KEY)
-    server_iface = _NetconfSSHServer()
-
-    try:
-        transport.start_server(server=server_iface)
-    except paramiko.SSHException as exc:
-        print(f"[Juniper] SSH negotiation failed from {address}: {exc}")
-        client_socket.close()
-        return
+    options = transport.get_security_options()
+    options.kex = SSH_KEX
+    options.ciphers = SSH_CIPHERS
+    options.digests = SSH_DIGESTS
+    transport.start_server(event=threading.Event(), server=_NetconfSSHServer())
+    _awaiting.append((time.monotonic() + CHANNEL_TIMEOUT, transport))
+    return transport
 
-    channel = transport.accept(30)
-    if channel is None:
-        print(f"[Juniper] No channel opened from {address}")
-        transport.close()
-        return
 
-    try:
-        handle_netconf_session(channel)
-    except Exception as exc:
-        print(f"[Juniper] Session error from {address}: {exc}")
-    finally:
+def _serve_plaintext() -> None:
+    """Accept NETCONF-over-TCP clients and hand their sockets to the reactor."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("0.0.0.0", NETCONF_PLAIN_PORT))
+    sock.listen(1024)
+    print(f"[Mock Juniper NETCONF] plaintext NETCONF on port {NETCONF_PLAIN_PORT}")
+    while True:
         try:
-            channel.close()
-        except Exception:
-            pass
-        transport.close()
+            client_socket, address = sock.accept()
+        except OSError:
+            break
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        _handoff(client_socket)
 
 
 def main() -> None:
+    logging.basicConfig(level=LOG_LEVEL, format="%(message)s")
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        # Lets several server processes share the port.
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
     sock.bind(("0.0.0.0", SSH_PORT))
-    sock.listen(10)
+    sock.listen(1024)  # absorb connection bursts without SYN drops
     print(f"[Mock Juniper NETCONF] {HOSTNAME} listening on port {SSH_PORT}")
 
     def _shutdown(sig, frame):
@@ -432,15 +678,28 @@ def main() -> None:
     signal.signal(signal.SIGINT, _shutdown)
     signal.signal(signal.SIGTERM, _shutdown)
 
+    threading.Thread(target=_reactor, daemon=True).start()
+    if NETCONF_PLAINTEXT:
+        threading.Thread(target=_serve_plaintext, daemon=True).start()
+
+    live: set = set()
     while True:
         try:
             client_socket, address = sock.accept()
-            print(f"[Juniper] Connection from {address}")
-            t = threading.Thread(target=_handle_connection, args=(client_socket, address))
-            t.daemon = True
-            t.start()
         except OSError:
             break
+        live.difference_update([t for t in live if not t.is_active()])
+        if len(live) >= MAX_SSH_CONNS:
+            log.warning("[Juniper] Refusing %s: %d connections open", address, MAX_SSH_CONNS)
+            client_socket.close()
+            continue
+        log.info("[Juniper] Connection from %s", address)
+        # _handle_connection never blocks, so it runs inline on the acceptor.
+        try:
+            live.add(_handle_connection(client_socket, address))
+        except Exception as exc:
+            log.warning("[Juniper] SSH negotiation failed from %s: %s", address, exc)
+            client_socket.close()
 
 
 if __name__ == "__main__":
@@ -8,14 +8,34 @@ Simulates the PAN-OS XML API and REST API endpoints used by the deplyx PaloAltoC
   - GET /api/?type=op&cmd=<validate><full>      → commit validation
 """
 
+# gevent must patch the stdlib before anything else imports socket/ssl.
+from gevent import monkey
+
+monkey.patch_all()
+
+import gzip
+import hashlib
 import os
-from flask import Flask, request, jsonify, Response
+import socket
+
+import orjson
+from flask import Flask, request, Response
+from gevent.pywsgi import WSGIServer
+from werkzeug.serving import make_ssl_devcert
 
 app = Flask(__name__)
 
+
+def _json(data, status=200):
+    """Serialize with orjson instead of going through jsonify."""
+    return Response(orjson.dumps(data), status=status, mimetype="application/json",
+                    direct_passthrough=True)
+
 API_KEY = os.getenv("PALOALTO_API_KEY", "pa-lab-apikey-001")
 HOSTNAME = os.getenv("PALOALTO_HOSTNAME", "PA-DC1-01")
 SERIAL = os.getenv("PALOALTO_SERIAL", "007200001234")
+API_PORT = int(os.getenv("API_PORT", "443"))
+TLS_CERT_BASE = os.getenv("TLS_CERT_BASE", "/tmp/paloalto-mock")
 
 # ---------- XML API ----------
 SYSTEM_INFO_XML = f"""<response status="success">
@@ -112,31 +132,54 @@ VALIDATE_XML = """<response status="success">
   </result>
 </response>"""
 
+# The XML bodies never change, so they are encoded once rather than on every
+# request.
+_SYSTEM_INFO_BYTES = SYSTEM_INFO_XML.encode()
+_INTERFACES_BYTES = INTERFACES_XML.encode()
+_VALIDATE_BYTES = VALIDATE_XML.encode()
+_INVALID_CREDS_BYTES = b'<response status="error"><msg>Invalid credentials</msg></response>'
+_UNKNOWN_CMD_BYTES = b'<response status="error"><msg>Unknown command</msg></response>'
+# The two bodies big enough to gain from it are also kept gzipped, for
+# pollers that send Accept-Encoding: gzip.
+_SYSTEM_INFO_GZ = gzip.compress(_SYSTEM_INFO_BYTES, compresslevel=6, mtime=0)
+_INTERFACES_GZ = gzip.compress(_INTERFACES_BYTES, compresslevel=6, mtime=0)
+# Every body below is prebuilt bytes: Response sets Content-Length from it up
+# front, and direct_passthrough hands it to the server as is instead of
+# re-encoding it chunk by chunk. A fresh Response is still made per request
+# because set_etag/vary mutate its headers.
+
+
+def _xml(body, gz_body):
+    """Serve a cached XML body, gzipped when the client accepts it."""
+    if request.accept_encodings["gzip"]:
+        resp = Response(gz_body, content_type="application/xml", direct_passthrough=True)
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp = Response(body, content_type="application/xml", direct_passthrough=True)
+    resp.vary.add("Accept-Encoding")
+    return resp
+
 
 @app.route("/api/", methods=["GET"])
 def xml_api():
     key = request.args.get("key", "")
     if key != API_KEY:
-        return Response(
-            '<response status="error"><msg>Invalid credentials</msg></response>',
-            content_type="application/xml", status=401,
-        )
+        return Response(_INVALID_CREDS_BYTES, content_type="application/xml", status=401,
+                        direct_passthrough=True)
 
     api_type = request.args.get("type", "")
     cmd = request.args.get("cmd", "")
 
     if api_type == "op":
         if "<show><system><info>" in cmd:
-            return Response(SYSTEM_INFO_XML, content_type="application/xml")
+            return _xml(_SYSTEM_INFO_BYTES, _SYSTEM_INFO_GZ)
         elif "<show><interface>" in cmd:
-            return Response(INTERFACES_XML, content_type="application/xml")
+            return _xml(_INTERFACES_BYTES, _INTERFACES_GZ)
         elif "<validate>" in cmd:
-            return Response(VALIDATE_XML, content_type="application/xml")
+            return Response(_VALIDATE_BYTES, content_type="application/xml", direct_passthrough=True)
 
-    return Response(
-        '<response status="error"><msg>Unknown command</msg></response>',
-        content_type="application/xml", status=400,
-    )
+    return Response(_UNKNOWN_CMD_BYTES, content_type="application/xml", status=400,
+                    direct_passthrough=True)
 
 
 # ---------- REST API ----------
@@ -213,48 +256,96 @@ SECURITY_RULES = [
     },
 ]
 
+# Serialized SecurityRules listing and its ETag, as one tuple so the two are
+# always swapped together; reset to None whenever a rule is added or updated,
+# and rebuilt on the next GET.
+_rules_cache = None
+
 
 @app.route("/restapi/v10.1/Policies/SecurityRules", methods=["GET"])
 def security_rules():
+    global _rules_cache
     api_key = request.headers.get("X-PAN-KEY", "")
     if api_key != API_KEY:
-        return jsonify({"@status": "error", "msg": "Invalid API key"}), 401
-    return jsonify({
-        "@status": "success",
-        "@code": "19",
-        "result": {
-            "@total-count": str(len(SECURITY_RULES)),
-            "entry": SECURITY_RULES,
-        },
-    })
+        return _json({"@status": "error", "msg": "Invalid API key"}, 401)
+    if (cache := _rules_cache) is None:
+        body = orjson.dumps({
+            "@status": "success",
+            "@code": "19",
+            "result": {
+                "@total-count": str(len(SECURITY_RULES)),
+                "entry": SECURITY_RULES,
+            },
+        })
+        cache = _rules_cache = (body, hashlib.blake2b(body, digest_size=8).hexdigest())
+    body, etag = cache
+    # Pollers that already hold this rule set get a 304 with no body.
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = Response(body, mimetype="application/json", direct_passthrough=True)
+    resp.set_etag(etag)
+    return resp
+
+
+def _rule_entry():
+    """The ``entry`` object of a SecurityRules request body, or None when the
+    body is not JSON or not shaped like a rule."""
+    # cache=False: the body is parsed once, so don't keep a copy on the request.
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    entry = data.get("entry", {}) if isinstance(data, dict) else None
+    return entry if isinstance(entry, dict) else None
+
+
+_BAD_BODY = {"@status": "error", "@code": "3", "msg": "Invalid request body"}
 
 
 @app.route("/restapi/v10.1/Policies/SecurityRules", methods=["POST"])
 def create_security_rule():
+    global _rules_cache
     api_key = request.headers.get("X-PAN-KEY", "")
     if api_key != API_KEY:
-        return jsonify({"@status": "error", "msg": "Invalid API key"}), 401
+        return _json({"@status": "error", "msg": "Invalid API key"}, 401)
     rule_name = request.args.get("name", "")
-    data = request.json or {}
-    entry = data.get("entry", {})
+    if (entry := _rule_entry()) is None:
+        return _json(_BAD_BODY, 400)
     entry["@name"] = rule_name
     SECURITY_RULES.append(entry)
-    return jsonify({"@status": "success", "@code": "20", "msg": "command succeeded"})
+    _rules_cache = None
+    return _json({"@status": "success", "@code": "20", "msg": "command succeeded"})
 
 
 @app.route("/restapi/v10.1/Policies/SecurityRules", methods=["PUT"])
 def update_security_rule():
+    global _rules_cache
     api_key = request.headers.get("X-PAN-KEY", "")
     if api_key != API_KEY:
-        return jsonify({"@status": "error", "msg": "Invalid API key"}), 401
+        return _json({"@status": "error", "msg": "Invalid API key"}, 401)
     rule_name = request.args.get("name", "")
     for i, rule in enumerate(SECURITY_RULES):
         if rule.get("@name") == rule_name:
-            data = request.json or {}
-            SECURITY_RULES[i].update(data.get("entry", {}))
-            return jsonify({"@status": "success", "msg": "command succeeded"})
-    return jsonify({"@status": "error", "msg": "Rule not found"}), 404
+            if (entry := _rule_entry()) is None:
+                return _json(_BAD_BODY, 400)
+            SECURITY_RULES[i].update(entry)
+            _rules_cache = None
+            return _json({"@status": "success", "msg": "command succeeded"})
+    return _json({"@status": "error", "msg": "Rule not found"}, 404)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=443, ssl_context="adhoc")
+    # gevent serves requests concurrently on greenlets, where the Werkzeug
+    # dev server handled them one at a time. The self-signed cert is created
+    # once and reused, rather than regenerated on every start by "adhoc".
+    cert_file, key_file = f"{TLS_CERT_BASE}.crt", f"{TLS_CERT_BASE}.key"
+    if not (os.path.exists(cert_file) and os.path.exists(key_file)):
+        cert_file, key_file = make_ssl_devcert(TLS_CERT_BASE, host=HOSTNAME)
+    # pywsgi sends the status line and headers in one write and the body in
+    # another; with Nagle on, every keep-alive response after the first then
+    # waits ~40 ms for the client's delayed ACK. Accepted sockets inherit
+    # TCP_NODELAY from the listener, so it is set once here.
+    listener = socket.create_server(("0.0.0.0", API_PORT), backlog=1024)
+    listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    WSGIServer(listener, app, keyfile=key_file, certfile=cert_file).serve_forever()
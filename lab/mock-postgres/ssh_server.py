@@ -1,12 +1,33 @@
 """Mock PostgreSQL SSH server."""
-import os, threading, signal, sys, socket
+import os, re, queue, threading, signal, sys, socket, selectors, time, collections
 import paramiko
 
-HOST_KEY = paramiko.RSAKey.generate(2048)
+HOST_KEY_PATH = os.getenv("HOST_KEY_PATH", "/tmp/mock_ssh_host_rsa")
+
+
+def _load_or_generate_host_key(path=HOST_KEY_PATH):
+    # Generating a 2048-bit RSA key costs seconds of CPU; do it once per container.
+    try: return paramiko.RSAKey(filename=path)
+    except (OSError, paramiko.SSHException):
+        key = paramiko.RSAKey.generate(2048)
+        try: key.write_private_key_file(path)
+        except OSError: pass
+        return key
+
+
+HOST_KEY = _load_or_generate_host_key()
 HOSTNAME = os.getenv("PG_HOSTNAME", "postgres-db-01")
 SSH_PORT = int(os.getenv("SSH_PORT", "22"))
 SSH_USER = os.getenv("SSH_USER", "admin")
+SSH_WORKERS = int(os.getenv("SSH_WORKERS", "1"))
+MAX_SSH_CONNS = int(os.getenv("MAX_SSH_CONNS", "64"))
 SSH_PASS = os.getenv("SSH_PASS", "Postgres123!")
+# Only offer algorithms that are cheap to negotiate and run: curve25519/ECDH
+# key exchange instead of the big-integer DH groups, AES done in C by
+# cryptography, SHA-2 MACs. Every client in the lab speaks these.
+SSH_KEX = ("curve25519-sha256@libssh.org", "ecdh-sha2-nistp256")
+SSH_CIPHERS = ("aes128-ctr", "aes256-ctr", "aes128-gcm@openssh.com", "aes256-gcm@openssh.com")
+SSH_DIGESTS = ("hmac-sha2-256", "hmac-sha2-512", "hmac-sha2-256-etm@openssh.com", "hmac-sha2-512-etm@openssh.com")
 
 COMMANDS = {
     "psql -l": f"""                                  List of databases
@@ -62,76 +83,226 @@ COMMANDS = {
 {HOSTNAME}$ """,
 }
 
+# Lowercased keys in COMMANDS order (the first of any duplicates wins). The
+# alternation tries them in that order, so one match() call finds the entry
+# the old startswith() scan over every key would have.
+COMMANDS_LC = {}
+for k, v in COMMANDS.items(): COMMANDS_LC.setdefault(k.lower(), v)
+_CMD_RE = re.compile("|".join(map(re.escape, COMMANDS_LC)))
+
+
+# Replies are encoded once here: with their CRLF framing for the shell, bare
+# for exec. Only the not-found reply echoes the command, so it is built from
+# pre-encoded halves around it.
+SHELL_B = {k: f"\r\n{v}\r\n".encode() for k, v in COMMANDS_LC.items()}
+EXEC_B = {k: v.encode() or b"\n" for k, v in COMMANDS_LC.items()}
+PROMPT_B = f"\r\n{HOSTNAME}$ ".encode()
+NOT_FOUND_B = (b"\r\nbash: ", f": command not found\r\n{HOSTNAME}$ \r\n".encode())
+
+
+def _lookup(cmd, table):
+    m = _CMD_RE.match(cmd.lower())
+    return table[m.group()] if m else None
+
 
 class MockSSH(paramiko.ServerInterface):
-    def __init__(self):
-        super().__init__()
-        self.exec_command = None
-        self._ready = threading.Event()
+    # Called on paramiko's transport thread: shell and exec requests hand
+    # their channel straight to the reactor, so no thread of ours waits in
+    # t.accept() for the client to get around to opening one.
     def check_channel_request(self, kind, chanid): return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
     def check_auth_password(self, username, password): return paramiko.AUTH_SUCCESSFUL if username == SSH_USER and password == SSH_PASS else paramiko.AUTH_FAILED
-    def check_channel_shell_request(self, channel): self._ready.set(); return True
+    def check_channel_shell_request(self, channel): _handoff(channel, None); return True
     def check_channel_exec_request(self, channel, command):
-        self.exec_command = command.decode("utf-8", errors="ignore").strip()
-        self._ready.set()
+        _handoff(channel, command.decode("utf-8", errors="ignore").strip())
         return True
     def get_allowed_auths(self, username): return "password,publickey"
     def check_auth_publickey(self, username, key): return paramiko.AUTH_SUCCESSFUL
 
 
+# Every channel is served from one selector driven by a single reactor
+# thread; the only per-connection thread left is paramiko's own transport.
+# New channels are queued by _handoff and picked up when the wake socket
+# turns readable. The selector and wake socketpair are made per process by
+# _init_reactor() so forked workers never share an epoll fd.
+_SEL = _WAKE_R = _WAKE_W = None
+_PENDING = queue.SimpleQueue()
+# Every live connection costs one paramiko transport thread; connections
+# beyond MAX_SSH_CONNS are refused instead of spawning threads without bound.
+_SLOTS = threading.BoundedSemaphore(MAX_SSH_CONNS)
+EXEC_LINGER = 0.25  # longest an answered exec channel waits for the client to close
+_lingering = collections.deque()  # (deadline, exec session), oldest first
+# A connection that has not handed the reactor a shell or exec channel
+# within CHANNEL_TIMEOUT is closed, so idle clients cannot pin a transport
+# thread (and a connection slot) forever.
+CHANNEL_TIMEOUT = float(os.getenv("SSH_CHANNEL_TIMEOUT", "30"))
+_awaiting = collections.deque()  # (deadline, transport), oldest first
+_handed_off = set()  # transports that have reached _handoff
+
+
+def _init_reactor():
+    global _SEL, _WAKE_R, _WAKE_W
+    _SEL = selectors.DefaultSelector()
+    _WAKE_R, _WAKE_W = socket.socketpair()
+    _WAKE_R.setblocking(False); _WAKE_W.setblocking(False)
+    _SEL.register(_WAKE_R, selectors.EVENT_READ)
+
+
+def _handoff(ch, exec_command):
+    _handed_off.add(ch.get_transport())
+    _PENDING.put((ch, exec_command))
+    try: _WAKE_W.send(b"\0")
+    except BlockingIOError: pass  # reactor already has a wake-up pending
+
+
+class _Session:
+    __slots__ = ("t", "ch", "buf")
+    def __init__(self, t, ch): self.t, self.ch, self.buf = t, ch, bytearray()
+    def close(self):
+        try: _SEL.unregister(self.ch)
+        except (KeyError, ValueError): pass
+        try: self.ch.close()
+        except: pass
+        self.t.close()
+    def hangup(self):
+        # Close just the channel: the client disconnects once it sees that,
+        # and closing the socket under its reply would reset the connection.
+        try: _SEL.unregister(self.ch)
+        except (KeyError, ValueError): pass
+        try: self.ch.close()
+        except: pass
+
+
+def _process(sess):
+    data = sess.ch.recv(4096)
+    if not data: sess.close(); return
+    if sess.buf is None: return  # exec channel: nothing to do until the client closes
+    sess.buf.extend(data)
+    replies = []  # everything answered by this read goes out in one sendall
+    while (idx := sess.buf.find(b"\n")) != -1:
+        line = bytes(sess.buf[:idx]); del sess.buf[:idx + 1]
+        cmd = line.decode("utf-8", errors="ignore").strip().rstrip("\r")
+        if not cmd: replies.append(PROMPT_B); continue
+        if cmd in ("exit", "quit"):
+            if replies: sess.ch.sendall(b"".join(replies))
+            sess.close(); return
+        if (out := _lookup(cmd, SHELL_B)) is None: replies += (NOT_FOUND_B[0], cmd.encode(), NOT_FOUND_B[1])
+        else: replies.append(out)
+    if replies: sess.ch.sendall(b"".join(replies))
+
+
+def _start(ch, cmd):
+    t = ch.get_transport()
+    ch.settimeout(5)  # a reply to a stalled client must not wedge the reactor
+    if cmd is not None:
+        if (out := _lookup(cmd, EXEC_B)) is None: out = f"bash: {cmd}: command not found\n".encode()
+        # paramiko only sends the exec request's CHANNEL_SUCCESS once the
+        # callback returns, so closing here could beat it to the client.
+        # Send EOF instead and tear down when the client closes its side,
+        # or after EXEC_LINGER for clients (ssh from a tty) that wait for us.
+        ch.sendall(out)
+        ch.send_exit_status(0)
+        ch.shutdown_write()
+        sess = _Session(t, ch); sess.buf = None
+        _SEL.register(ch, selectors.EVENT_READ, sess)
+        _lingering.append((time.monotonic() + EXEC_LINGER, sess))
+        return
+    ch.sendall(PROMPT_B)
+    _SEL.register(ch, selectors.EVENT_READ, _Session(t, ch))
+
+
+def _reactor():
+    while True:
+        for key, _ in _SEL.select(timeout=EXEC_LINGER if _lingering else 1):
+            if key.data is None:
+                try: _WAKE_R.recv(4096)
+                except BlockingIOError: pass
+                while True:
+                    try: ch, cmd = _PENDING.get_nowait()
+                    except queue.Empty: break
+                    try: _start(ch, cmd)
+                    except Exception:
+                        try: ch.close()
+                        except: pass
+                        ch.get_transport().close()
+                continue
+            try: _process(key.data)
+            except Exception: key.data.close()
+        now = time.monotonic()
+        while _lingering and _lingering[0][0] <= now:
+            sess = _lingering.popleft()[1]
+            if sess.ch.closed: sess.t.close()  # second expiry: drop a client that never left
+            else: sess.hangup(); _lingering.append((now + EXEC_LINGER, sess))
+        while _awaiting and _awaiting[0][0] <= now:
+            t = _awaiting.popleft()[1]
+            if t in _handed_off: _handed_off.discard(t)
+            else: t.close()
+
+
+class _Transport(paramiko.Transport):
+    """Transport that gives its connection slot back when its thread exits."""
+
+    def run(self):
+        try: super().run()
+        finally: _SLOTS.release()
+
+
 def handle_client(sock, addr):
-    t = paramiko.Transport(sock)
+    """Start SSH negotiation on paramiko's transport thread and return at
+    once; channels reach the reactor through MockSSH's request callbacks."""
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # replies are small writes
+    t = _Transport(sock)
     t.add_server_key(HOST_KEY)
-    server = MockSSH()
-    t.start_server(server=server)
-    ch = t.accept(30)
-    if not ch: t.close(); return
-    server._ready.wait(timeout=5)
-    if server.exec_command is not None:
-        cmd = server.exec_command
-        resp = next((v for k, v in COMMANDS.items() if cmd.lower().startswith(k.lower())), f"bash: {cmd}: command not found\n")
-        try:
-            ch.sendall(resp.encode() if resp else b"\n")
-            ch.send_exit_status(0)
-        except Exception:
-            pass
-        finally:
-            try: ch.close()
-            except: pass
-            t.close()
-        return
-    try:
-        ch.sendall(f"\r\n{HOSTNAME}$ ".encode())
-        buf = b""
-        while True:
-            data = ch.recv(4096)
-            if not data: break
-            buf += data
-            while b"\n" in buf:
-                line, buf = buf.split(b"\n", 1)
-                cmd = line.decode("utf-8", errors="ignore").strip().rstrip("\r")
-                if not cmd: ch.sendall(f"\r\n{HOSTNAME}$ ".encode()); continue
-                if cmd in ("exit", "quit"): return
-                resp = next((v for k, v in COMMANDS.items() if cmd.lower().startswith(k.lower())), f"bash: {cmd}: command not found\r\n{HOSTNAME}$ ")
-                ch.sendall(f"\r\n{resp}\r\n".encode())
-    except Exception: pass
-    finally:
-        try: ch.close()
-        except: pass
-        t.close()
+    opts = t.get_security_options()
+    opts.kex, opts.ciphers, opts.digests = SSH_KEX, SSH_CIPHERS, SSH_DIGESTS
+    t.start_server(event=threading.Event(), server=MockSSH())
+    _awaiting.append((time.monotonic() + CHANNEL_TIMEOUT, t))
 
 
-def main():
+def _listen():
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", SSH_PORT)); s.listen(5)
-    print(f"[Mock PostgreSQL {HOSTNAME}] Listening on :{SSH_PORT}")
+    # SO_REUSEPORT lets each forked worker bind its own listener on the same
+    # port; the kernel then spreads incoming connections across them.
+    if hasattr(socket, "SO_REUSEPORT"): s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    s.bind(("0.0.0.0", SSH_PORT)); s.listen(1024)  # absorb connection bursts without SYN drops
+    return s
+
+
+def serve_forever(s):
+    _init_reactor()
     signal.signal(signal.SIGTERM, lambda *_: (s.close(), sys.exit(0)))
     signal.signal(signal.SIGINT, lambda *_: (s.close(), sys.exit(0)))
+    threading.Thread(target=_reactor, daemon=True).start()
     while True:
-        try:
-            c, a = s.accept()
-            threading.Thread(target=handle_client, args=(c, a), daemon=True).start()
+        try: c, a = s.accept()
         except OSError: break
+        if not _SLOTS.acquire(blocking=False): c.close(); continue
+        # handle_client never blocks, so it runs inline on the acceptor.
+        try: handle_client(c, a)
+        except Exception: c.close(); _SLOTS.release()
+
+
+def main():
+    if SSH_WORKERS <= 1:
+        s = _listen()
+        print(f"[Mock PostgreSQL {HOSTNAME}] Listening on :{SSH_PORT}")
+        serve_forever(s)
+        return
+    children = []
+    for _ in range(SSH_WORKERS):
+        pid = os.fork()
+        if pid == 0:
+            try: serve_forever(_listen())
+            finally: os._exit(0)
+        children.append(pid)
+    print(f"[Mock PostgreSQL {HOSTNAME}] Listening on :{SSH_PORT} ({SSH_WORKERS} workers)")
+    def stop(*_):
+        for pid in children:
+            try: os.kill(pid, signal.SIGTERM)
+            except OSError: pass
+        os._exit(0)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in children: os.wait()
 
 if __name__ == "__main__": main()
@@ -12,23 +12,42 @@ Environment overrides:
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 API_BASE = os.getenv("DEPLYX_API_BASE", "http://localhost:8000/api/v1")
 ADMIN_EMAIL = os.getenv("DEPLYX_ADMIN_EMAIL", "labadmin@deplyx.io")
 ADMIN_PASSWORD = os.getenv("DEPLYX_ADMIN_PASSWORD", "LabAdmin123!")
+# Concurrent connector registrations; the session pool holds as many connections.
+REGISTER_WORKERS = 16
 
 
-def get_auth_headers() -> dict[str, str]:
+def make_session() -> requests.Session:
+    """Session whose keep-alive connections are reused by every API call.
+
+    Idempotent requests are retried on gateway errors while the API is still
+    starting; urllib3 never retries the POSTs.
+    """
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=REGISTER_WORKERS, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_auth_headers(session: requests.Session) -> dict[str, str]:
     """Register admin user (if needed) and get auth token."""
     # Try to register
-    requests.post(
+    session.post(
         f"{API_BASE}/auth/register",
         json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD, "role": "admin"},
     )
     # Login
-    res = requests.post(
+    res = session.post(
         f"{API_BASE}/auth/login",
         json={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
     )
@@ -39,89 +58,112 @@ def get_auth_headers() -> dict[str, str]:
     return {"Authorization": f"Bearer {token}"}
 
 
-SUPPORTED_TYPE_IDS = {"fortinet", "paloalto", "checkpoint", "cisco-ios", "cisco-nxos", "juniper"}
+# Device credentials, read once rather than on every discovered container
+FORTINET_API_TOKEN = os.getenv("FORTINET_API_TOKEN", "fg-lab-token-001")
+PALOALTO_API_KEY   = os.getenv("PALOALTO_API_KEY", "pa-lab-apikey-001")
+CHECKPOINT_USER    = os.getenv("CHECKPOINT_USER", "admin")
+CHECKPOINT_PASS    = os.getenv("CHECKPOINT_PASS", "Cp@ssw0rd!")
+CISCO_DRIVER_TYPE  = os.getenv("CISCO_DRIVER_TYPE", os.getenv("CISCO_DRIVER", "ios"))
+CISCO_USER         = os.getenv("CISCO_USER", "admin")
+CISCO_PASS         = os.getenv("CISCO_PASS", "Cisco123!")
+JUNIPER_USER       = os.getenv("JUNIPER_USER", "admin")
+JUNIPER_PASS       = os.getenv("JUNIPER_PASS", "Juniper123!")
+
+
+def _fortinet_payload(name: str, host: str) -> dict:
+    return {
+        "name": f"{name} (Fortinet)",
+        "connector_type": "fortinet",
+        "config": {
+            "host": host,
+            "api_token": FORTINET_API_TOKEN,
+            "verify_ssl": False,
+        },
+        "sync_mode": "on-demand",
+        "sync_interval_minutes": 30,
+    }
+
+
+def _paloalto_payload(name: str, host: str) -> dict:
+    return {
+        "name": f"{name} (Palo Alto)",
+        "connector_type": "paloalto",
+        "config": {
+            "host": host,
+            "api_key": PALOALTO_API_KEY,
+            "verify_ssl": False,
+        },
+        "sync_mode": "on-demand",
+        "sync_interval_minutes": 30,
+    }
+
+
+def _checkpoint_payload(name: str, host: str) -> dict:
+    return {
+        "name": f"{name} (Check Point)",
+        "connector_type": "checkpoint",
+        "config": {
+            "host": host,
+            "username": CHECKPOINT_USER,
+            "password": CHECKPOINT_PASS,
+            "verify_ssl": False,
+        },
+        "sync_mode": "on-demand",
+        "sync_interval_minutes": 60,
+    }
+
+
+def _cisco_payload(name: str, host: str, driver_type: str) -> dict:
+    return {
+        "name": f"{name} (Cisco {driver_type})",
+        "connector_type": "cisco",
+        "config": {
+            "host": host,
+            "username": CISCO_USER,
+            "password": CISCO_PASS,
+            "driver_type": driver_type,
+        },
+        "sync_mode": "on-demand",
+        "sync_interval_minutes": 30,
+    }
+
+
+def _juniper_payload(name: str, host: str) -> dict:
+    return {
+        "name": f"{name} (Juniper)",
+        "connector_type": "juniper",
+        "config": {
+            "host": host,
+            "username": JUNIPER_USER,
+            "password": JUNIPER_PASS,
+        },
+        "sync_mode": "on-demand",
+        "sync_interval_minutes": 30,
+    }
+
+
+# Lab container type_id -> connector payload builder(name, host)
+PAYLOAD_BUILDERS = {
+    "fortinet": _fortinet_payload,
+    "paloalto": _paloalto_payload,
+    "checkpoint": _checkpoint_payload,
+    "cisco-ios": lambda name, host: _cisco_payload(name, host, CISCO_DRIVER_TYPE),
+    "cisco-nxos": lambda name, host: _cisco_payload(name, host, "nxos"),
+    "juniper": _juniper_payload,
+}
+SUPPORTED_TYPE_IDS = set(PAYLOAD_BUILDERS)
 
 
 def to_connector_payload(container: dict) -> dict | None:
-    type_id = container.get("type_id", "")
+    build = PAYLOAD_BUILDERS.get(container.get("type_id", ""))
     host = container.get("ip", "")
-    name = container.get("name", container.get("id", "lab-device"))
-    if type_id not in SUPPORTED_TYPE_IDS or not host:
+    if build is None or not host:
         return None
+    return build(container.get("name", container.get("id", "lab-device")), host)
 
-    if type_id == "fortinet":
-        return {
-            "name": f"{name} (Fortinet)",
-            "connector_type": "fortinet",
-            "config": {
-                "host": host,
-                "api_token": os.getenv("FORTINET_API_TOKEN", "fg-lab-token-001"),
-                "verify_ssl": False,
-            },
-            "sync_mode": "on-demand",
-            "sync_interval_minutes": 30,
-        }
-
-    if type_id == "paloalto":
-        return {
-            "name": f"{name} (Palo Alto)",
-            "connector_type": "paloalto",
-            "config": {
-                "host": host,
-                "api_key": os.getenv("PALOALTO_API_KEY", "pa-lab-apikey-001"),
-                "verify_ssl": False,
-            },
-            "sync_mode": "on-demand",
-            "sync_interval_minutes": 30,
-        }
-
-    if type_id == "checkpoint":
-        return {
-            "name": f"{name} (Check Point)",
-            "connector_type": "checkpoint",
-            "config": {
-                "host": host,
-                "username": os.getenv("CHECKPOINT_USER", "admin"),
-                "password": os.getenv("CHECKPOINT_PASS", "Cp@ssw0rd!"),
-                "verify_ssl": False,
-            },
-            "sync_mode": "on-demand",
-            "sync_interval_minutes": 60,
-        }
-
-    if type_id in {"cisco-ios", "cisco-nxos"}:
-        driver_type = "nxos" if type_id == "cisco-nxos" else os.getenv("CISCO_DRIVER_TYPE", os.getenv("CISCO_DRIVER", "ios"))
-        return {
-            "name": f"{name} (Cisco {driver_type})",
-            "connector_type": "cisco",
-            "config": {
-                "host": host,
-                "username": os.getenv("CISCO_USER", "admin"),
-                "password": os.getenv("CISCO_PASS", "Cisco123!"),
-                "driver_type": driver_type,
-            },
-            "sync_mode": "on-demand",
-            "sync_interval_minutes": 30,
-        }
-
-    if type_id == "juniper":
-        return {
-            "name": f"{name} (Juniper)",
-            "connector_type": "juniper",
-            "config": {
-                "host": host,
-                "username": os.getenv("JUNIPER_USER", "admin"),
-                "password": os.getenv("JUNIPER_PASS", "Juniper123!"),
-            },
-            "sync_mode": "on-demand",
-            "sync_interval_minutes": 30,
-        }
-
-    return None
-
-
-def discover_devices(headers: dict[str, str]) -> list[dict]:
-    res = requests.get(f"{API_BASE}/lab/containers", headers=headers)
+
+def discover_devices(session: requests.Session) -> list[dict]:
+    res = session.get(f"{API_BASE}/lab/containers")
     if res.status_code != 200:
         print(f"Could not fetch /lab/containers: {res.status_code} {res.text}")
         return []
@@ -142,34 +184,39 @@ def main():
     print("=" * 60)
     print()
 
-    headers = get_auth_headers()
+    session = make_session()
+    session.headers.update(get_auth_headers(session))
     print(f"Authenticated as {ADMIN_EMAIL}\n")
 
-    devices = discover_devices(headers)
+    devices = discover_devices(session)
     print(f"Discovered {len(devices)} supported running lab device(s)\n")
 
     # Check existing connectors
-    existing = requests.get(f"{API_BASE}/connectors", headers=headers)
+    existing = session.get(f"{API_BASE}/connectors")
     existing_names = set()
     if existing.status_code == 200:
         existing_names = {c["name"] for c in existing.json()}
 
+    pending = []
     for device in devices:
         name = device["name"]
         if name in existing_names:
             print(f"  [skip] {name} — already registered")
             continue
-
-        res = requests.post(
-            f"{API_BASE}/connectors",
-            json=device,
-            headers=headers,
-        )
-        if res.status_code == 201:
-            connector_id = res.json()["id"]
-            print(f"  [✓] {name} — registered (id={connector_id})")
-        else:
-            print(f"  [✗] {name} — failed: {res.text}")
+        pending.append(device)
+
+    # Each registration is an independent POST, so they are sent together
+    # rather than one round trip after another; results print as they land.
+    with ThreadPoolExecutor(max_workers=REGISTER_WORKERS) as pool:
+        futures = {pool.submit(session.post, f"{API_BASE}/connectors", json=d): d["name"] for d in pending}
+        for future in as_completed(futures):
+            name = futures[future]
+            res = future.result()
+            if res.status_code == 201:
+                connector_id = res.json()["id"]
+                print(f"  [✓] {name} — registered (id={connector_id})")
+            else:
+                print(f"  [✗] {name} — failed: {res.text}")
 
     print()
     print("All devices registered. You can now sync them via the UI or API:")
@@ -1,88 +1,206 @@
 #!/usr/bin/env python3
 """Quick script to test LLM impact analysis on all 3 changes."""
+import base64
 import json
+import os
 import sys
 import time
-import urllib.request
+
+import urllib3
+
+# orjson (optional) serialises straight to bytes and parses bytes without an
+# intermediate str; the stdlib is used when it is not installed.
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
 
 BASE = "http://localhost:8000/api/v1"
+LOGIN_EMAIL = "llmtest@deplyx.io"
+LOGIN_BODY = _dumps({"email": LOGIN_EMAIL, "password": "TestPass123!"})
+# Tokens are reused across runs until shortly before they expire.
+TOKEN_CACHE = os.path.expanduser("~/.cache/deplyx/token.json")
+
+# Keep-alive connections shared by the login and the impact stream instead
+# of a fresh connection for every call. There is no fixed pacing between
+# requests: a busy server answering 429 or 503 is retried after its
+# Retry-After, or with exponential backoff when it sends none. Only the
+# default idempotent methods are retried like that; a POST may already
+# have been acted on by the time a 503 or a dropped read comes back, so
+# it is only retried on 429, which the server answers without acting.
+pool = urllib3.PoolManager(
+    maxsize=4,
+    retries=urllib3.Retry(total=3, backoff_factor=1, status_forcelist=[429, 503], raise_on_status=False),
+)
 
-def login():
-    data = json.dumps({"email": "llmtest@deplyx.io", "password": "TestPass123!"}).encode()
-    req = urllib.request.Request(f"{BASE}/auth/login", data=data, headers={"Content-Type": "application/json"})
-    with urllib.request.urlopen(req) as r:
-        return json.load(r)["access_token"]
+class _PostRetry(urllib3.Retry):
+    # urllib3 also retries a 503 carrying Retry-After whatever the forcelist says.
+    RETRY_AFTER_STATUS_CODES = frozenset({429})
 
-def get_impact(token, cid, label):
-    req = urllib.request.Request(
-        f"{BASE}/changes/{cid}/impact",
-        headers={"Authorization": f"Bearer {token}"}
+POST_RETRY = _PostRetry(
+    total=3, read=0, other=0, backoff_factor=1, status_forcelist=[429], allowed_methods=None, raise_on_status=False
+)
+
+def _json(r):
+    if r.status >= 400:
+        raise RuntimeError(f"HTTP {r.status}: {r.data[:200].decode(errors='replace')}")
+    return _loads(r.data)
+
+def _token_exp(token):
+    """The ``exp`` claim of a JWT; verifying the signature is the server's job."""
+    claims = token.split(".")[1]
+    return _loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))["exp"]
+
+def login(refresh=False):
+    if not refresh:
+        try:
+            with open(TOKEN_CACHE, "rb") as f:
+                cached = _loads(f.read())
+            if (cached["base"], cached["email"]) == (BASE, LOGIN_EMAIL) and cached["exp"] > time.time() + 30:
+                return cached["token"]
+        except (OSError, ValueError, KeyError):
+            pass
+    r = pool.request(
+        "POST", f"{BASE}/auth/login", body=LOGIN_BODY, headers={"Content-Type": "application/json"}, retries=POST_RETRY
     )
-    with urllib.request.urlopen(req, timeout=120) as r:
-        data = json.load(r)
+    token = _json(r)["access_token"]
+    try:
+        entry = _dumps({"base": BASE, "email": LOGIN_EMAIL, "token": token, "exp": _token_exp(token)})
+        os.makedirs(os.path.dirname(TOKEN_CACHE), exist_ok=True)
+        with os.fdopen(os.open(TOKEN_CACHE, os.O_CREAT | os.O_WRONLY | os.O_TRUNC, 0o600), "wb") as f:
+            f.write(entry)
+    except (OSError, ValueError, KeyError, IndexError):
+        pass  # not a JWT with an expiry, or nowhere to write: just don't cache it
+    return token
+
+def stream_impacts(token, cids):
+    """Yield each change's impact payload as soon as the server pushes it.
 
+    The server analyses the changes concurrently and sends one Server-Sent
+    Event per change. An ``error`` event for a failed analysis is yielded as
+    ``{"change_id": ..., "error": detail}`` and the stream goes on with the
+    other changes.
+    """
+    def request(token):
+        return pool.request(
+            "GET", f"{BASE}/changes/impact/stream",
+            fields=[("ids", cid) for cid in cids],
+            headers={"Authorization": f"Bearer {token}", "Accept": "text/event-stream"},
+            timeout=urllib3.Timeout(connect=10, read=120),
+            preload_content=False,
+        )
+
+    r = request(token)
+    if r.status == 401:
+        # A cached token the server no longer accepts: log in afresh once.
+        r.drain_conn()
+        r = request(login(refresh=True))
+    try:
+        if r.status >= 400:
+            _json(r)
+        event, data = "message", []
+        for line in r:
+            line = line.rstrip(b"\r\n")
+            if line:
+                field, _, value = line.partition(b":")
+                value = value.removeprefix(b" ")
+                if field == b"event":
+                    event = value.decode()
+                elif field == b"data":
+                    data.append(value)
+                continue
+            # A blank line ends the event.
+            if data:
+                payload = _loads(b"\n".join(data))
+                if event == "error":
+                    payload = {"change_id": payload["change_id"], "error": payload["detail"]}
+                yield payload
+            event, data = "message", []
+    finally:
+        r.release_conn()
+
+def print_impact(data, cid, label):
     impact = data.get("impact", {})
-    print(f"\n{'='*70}")
-    print(f"  {label}")
-    print(f"  Change ID: {cid}")
-    print(f"  LLM Powered: {impact.get('llm_powered')}")
-    print(f"{'='*70}")
+    # One write per report, so it lands as a single block on the terminal.
+    sys.stdout.write("\n".join(_report_lines(impact, cid, label)) + "\n")
+    sys.stdout.flush()
+    return impact
+
+# Risk-item fields tried in order for the one-line description.
+_RISK_ITEM_KEYS = ("factor", "name", "description", "action")
+
+def _report_lines(impact, cid, label):
+    out = []
+    emit = out.append
+    emit(f"\n{'='*70}")
+    emit(f"  {label}")
+    emit(f"  Change ID: {cid}")
+    emit(f"  LLM Powered: {impact.get('llm_powered')}")
+    emit(f"{'='*70}")
 
     if not impact.get("llm_powered"):
-        print("  *** LLM did not run - graph-only fallback ***")
-        print(f"  Graph found {impact.get('total_dependency_count', 0)} dependencies")
-        print(f"  Max criticality: {impact.get('max_criticality', 'N/A')}")
-        print(f"  Traversal: {impact.get('traversal_strategy', 'N/A')}")
-        print(f"  Critical paths (graph): {len(impact.get('critical_paths', []))}")
-        return impact
+        emit("  *** LLM did not run - graph-only fallback ***")
+        emit(f"  Graph found {impact.get('total_dependency_count', 0)} dependencies")
+        emit(f"  Max criticality: {impact.get('max_criticality', 'N/A')}")
+        emit(f"  Traversal: {impact.get('traversal_strategy', 'N/A')}")
+        emit(f"  Critical paths (graph): {len(impact.get('critical_paths', []))}")
+        return out
 
     # Action Analysis
     aa = impact.get("action_analysis", {})
     if aa:
-        print(f"\n  ACTION ANALYSIS:")
+        emit(f"\n  ACTION ANALYSIS:")
         for k, v in aa.items():
-            print(f"    {k}: {v}")
+            emit(f"    {k}: {v}")
 
     # Risk Assessment
     ra = impact.get("risk_assessment", {})
     if ra:
-        print(f"\n  RISK ASSESSMENT:")
+        emit(f"\n  RISK ASSESSMENT:")
         for k, v in ra.items():
             if isinstance(v, list):
-                print(f"    {k}:")
+                emit(f"    {k}:")
                 for item in v:
                     if isinstance(item, dict):
-                        desc = item.get("factor", item.get("name", item.get("description", item.get("action", str(item)))))
-                        print(f"      - {desc}")
+                        # First key present wins; str(item) is only built when none is.
+                        key = next((k for k in _RISK_ITEM_KEYS if k in item), None)
+                        desc = item[key] if key is not None else str(item)
+                        emit(f"      - {desc}")
                     else:
-                        print(f"      - {item}")
+                        emit(f"      - {item}")
             else:
-                print(f"    {k}: {v}")
+                emit(f"    {k}: {v}")
 
     # Blast Radius
     br = impact.get("blast_radius", {})
     if br:
-        print(f"\n  BLAST RADIUS:")
+        emit(f"\n  BLAST RADIUS:")
         for k, v in br.items():
-            print(f"    {k}: {v}")
+            emit(f"    {k}: {v}")
 
     # Critical Paths
     paths = impact.get("critical_paths", [])
     if paths:
-        print(f"\n  CRITICAL PATHS ({len(paths)}):")
+        emit(f"\n  CRITICAL PATHS ({len(paths)}):")
         for i, p in enumerate(paths, 1):
             nodes = p.get("nodes", p.get("path", []))
             if nodes and isinstance(nodes[0], dict):
                 chain = " -> ".join(n.get("id", "?") for n in nodes)
             else:
-                chain = " -> ".join(str(n) for n in nodes)
+                chain = " -> ".join(map(str, nodes))
             crit = p.get("criticality", "?")
             reasoning = p.get("reasoning", "")
-            print(f"    {i}. [{crit}] {chain}")
+            emit(f"    {i}. [{crit}] {chain}")
             if reasoning:
-                print(f"       Reason: {reasoning}")
+                emit(f"       Reason: {reasoning}")
 
-    return impact
+    return out
 
 
 def main():
@@ -101,19 +219,30 @@ def main():
     token = login()
     print(f"Authenticated. Testing {len(changes)} change(s)...")
 
-    results = []
-    for i, (cid, label) in enumerate(changes):
-        if i > 0:
-            print(f"\n  ... waiting 5s ...")
-            time.sleep(5)
-        result = get_impact(token, cid, label)
-        results.append((label, result))
+    # One stream for all the changes: each report prints as soon as its
+    # analysis is done, and the summary keeps the change order.
+    # A failed analysis is recorded and reported at the end, so it does not
+    # cost the reports of the changes that did succeed.
+    labels = dict(changes)
+    impacts = {}
+    failures = {}
+    for data in stream_impacts(token, list(labels)):
+        cid = data["change_id"]
+        if "error" in data:
+            failures[cid] = data["error"]
+        else:
+            impacts[cid] = print_impact(data, cid, labels[cid])
 
     # Summary
     print(f"\n{'='*70}")
     print("  SUMMARY")
     print(f"{'='*70}")
-    for label, r in results:
+    for cid, label in changes:
+        r = impacts.get(cid)
+        if r is None:
+            print(f"  {label}")
+            print(f"    FAILED: {failures.get(cid, 'no result received')}")
+            continue
         llm = r.get("llm_powered", False)
         deps = r.get("total_dependency_count", 0)
         crit = r.get("max_criticality", "N/A")
@@ -122,6 +251,10 @@ def main():
         print(f"  {label}")
         print(f"    LLM: {'Yes' if llm else 'No'} | Deps: {deps} | Criticality: {crit} | Paths: {paths} | Risk: {sev}")
 
+    failed = len(changes) - len(impacts)
+    if failed:
+        sys.exit(f"\n{failed} of {len(changes)} impact analyses failed")
+
 
 if __name__ == "__main__":
     main()